@@ -0,0 +1,163 @@
+"""
+Times every HTML extractor backend over saved pages and reports parse time and memory.
+
+    python app/benchmarks/benchmark_extractors.py [page.html ...] [--runs N]
+
+Defaults to debug_post_source.html and any *.html under fixtures/. Each page is also run with
+post markup (caption, time, image) and profile markup (name, picture, bio link) spliced in, so
+the lookups that succeed are timed as well as the misses. Memory is measured in a fresh process
+per backend that keeps MEMORY_COPIES parsed copies of the page alive: the growth of the current RSS
+(which includes lxml's C tree) and the tracemalloc peak (Python objects only), per copy.
+"""
+import argparse
+import gc
+import glob
+import multiprocessing
+import os
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from tools.extractors import (available_extractors, get_extractor, find_meta, find_post_fields, find_club_name_pfp,
+                              find_club_links, find_club_post_links, CLUB_NAME_CLASS, POST_CAPTION_CLASS,
+                              POST_TIME_CLASS, POST_IMAGE_CLASS)
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+DEFAULT_RUNS = 20
+# Parsed copies held at once while measuring memory, so one page's allocations are not lost in the noise
+MEMORY_COPIES = 20
+BENCH_CLUB = "bench_club"
+
+POST_MARKUP = (
+    f'<article><h1 class="{POST_CAPTION_CLASS}">Join us for our general meeting &amp; free pizza!</h1>'
+    f'<time class="{POST_TIME_CLASS}" datetime="2025-01-15T02:00:00.000Z">January 14</time>'
+    f'<img class="{POST_IMAGE_CLASS}" src="https://example.com/post.jpg" alt="">'
+    f'<a href="/p/C0ffee123/">post</a></article>'
+    f'<header><span class="{CLUB_NAME_CLASS}">Bench <b>Club</b></span>'
+    f'<img alt="{BENCH_CLUB}\'s profile picture" src="https://example.com/{BENCH_CLUB}.jpg">'
+    f'<a rel="me" href="https://example.com/{BENCH_CLUB}">example.com/{BENCH_CLUB}</a></header>'
+)
+
+
+def default_pages() -> list[str]:
+    pages = [os.path.join(REPO_ROOT, "debug_post_source.html")]
+    pages += sorted(glob.glob(os.path.join(REPO_ROOT, "fixtures", "**", "*.html"), recursive=True))
+    return [page for page in pages if os.path.exists(page)]
+
+
+def with_post_markup(html: str) -> str:
+    """The page with a post's and a profile's elements placed at the end of its body, where the app renders them."""
+    index = html.rfind("</body>")
+    return html[:index] + POST_MARKUP + html[index:] if index != -1 else html + POST_MARKUP
+
+
+def extract(extractor, html: str) -> tuple:
+    """Everything the scraper reads from a profile or post page."""
+    return read_page(extractor.load(html))
+
+
+def read_page(page) -> tuple:
+    try:
+        name_pfp = find_club_name_pfp(page, BENCH_CLUB)
+    except Exception:  # not a profile page: the span or the picture is missing
+        name_pfp = None
+    return (find_post_fields(page), find_meta(page, name='description'), tuple(find_club_post_links(page)),
+            name_pfp, tuple((link['text'], link['url']) for link in find_club_links(page)))
+
+
+def time_backend(name: str, html: str, runs: int) -> dict:
+    extractor = get_extractor(name)
+    result = extract(extractor, html)  # warm-up, compiles patterns
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        extract(extractor, html)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {"median_ms": statistics.median(timings), "min_ms": min(timings), "result": result}
+
+
+def current_rss_mb() -> float:
+    """Resident memory now, from /proc/self/statm; where there is no /proc, the peak so far."""
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * resource.getpagesize() / 2 ** 20
+    except OSError:
+        # ru_maxrss is in KB on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 1024
+
+
+def _load_copies(extractor, html: str) -> list:
+    """MEMORY_COPIES parsed pages, each with what was read from it, all kept alive."""
+    copies = []
+    for _ in range(MEMORY_COPIES):
+        page = extractor.load(html)
+        copies.append((page, read_page(page)))
+    return copies
+
+
+def _measure_memory(name: str, html: str, queue) -> None:
+    extractor = get_extractor(name)
+    extract(extractor, html)  # warm-up: imports and compiled patterns are not the page's cost
+    gc.collect()
+
+    baseline = current_rss_mb()
+    copies = _load_copies(extractor, html)
+    rss_growth = current_rss_mb() - baseline
+    del copies
+    gc.collect()
+
+    # A separate pass: tracemalloc's own bookkeeping would otherwise count as RSS
+    tracemalloc.start()
+    copies = _load_copies(extractor, html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del copies
+    queue.put((max(rss_growth, 0.0) / MEMORY_COPIES, peak / 2 ** 20 / MEMORY_COPIES))
+
+
+def measure_memory(name: str, html: str) -> tuple:
+    """:return: (RSS growth MB, tracemalloc peak MB) per parsed copy of the page, measured in a fresh process"""
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=_measure_memory, args=(name, html, queue))
+    process.start()
+    measured = queue.get()
+    process.join()
+    return measured
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("pages", nargs="*", help="saved HTML pages (default: repo fixtures)")
+    arg_parser.add_argument("--runs", type=int, default=DEFAULT_RUNS)
+    args = arg_parser.parse_args()
+
+    backends = available_extractors()
+    print(f"Backends: {', '.join(backends)}; {args.runs} runs each\n")
+    print(f"{'page':<40} {'backend':<7} {'median ms':>10} {'min ms':>9} {'RSS MB/copy':>12} {'py MB/copy':>11}")
+
+    for path in args.pages or default_pages():
+        with open(path, 'r', encoding='utf-8', errors='replace') as file:
+            html = file.read()
+        name = os.path.basename(path)
+        for label, source in ((name, html), (f"{name} +post", with_post_markup(html))):
+            results = {}
+            for backend in backends:
+                timing = time_backend(backend, source, args.runs)
+                rss_mb, python_mb = measure_memory(backend, source)
+                results[backend] = timing["result"]
+                print(f"{label[:40]:<40} {backend:<7} {timing['median_ms']:>10.2f} {timing['min_ms']:>9.2f} "
+                      f"{rss_mb:>12.3f} {python_mb:>11.3f}")
+
+            reference = results.get('soup', next(iter(results.values())))
+            for backend, result in results.items():
+                if result != reference:
+                    print(f"  ! {backend} extracted {result} (soup: {reference})")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Runs the scraper's real page code paths offline against recorded pages and reports throughput, CPU and memory.
+
+    python app/benchmarks/benchmark_scraper.py [--fixtures DIR] [--synthetic N] [--runs N]
+
+Pages are served by a ReplayServer in a separate process, so the CPU reported is the scraper's
+alone. Record fixtures from a live scrape with FIXTURE_RECORD_DIR=fixtures (see tools/fixtures.py);
+without any, synthetic clubs built from debug_post_source.html are used. For each club it times
+get_club_info, get_post_info on every post and save_post_info into a temporary data directory,
+then reports pages/sec, CPU ms and Python memory peak per club for each. Nothing leaves the machine.
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from tools.logger import logger
+from tools.fixtures import FIXTURES_DIR, FIXTURE_FILE_NAME, ReplayServer, fixture_path
+from tools.page_fetcher import INSTAGRAM_URL, HttpFetcher
+from tools.insta_scraper import InstagramScraper
+from tools.extractors import POST_CAPTION_CLASS, POST_TIME_CLASS, POST_IMAGE_CLASS
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+DEFAULT_RUNS = 3
+SYNTHETIC_POSTS = 12
+# Top-level fixture directories that hold posts rather than profiles
+POST_DIRECTORIES = ("p", "reel")
+PHASES = ("get_club_info", "get_post_info", "save_post_info")
+
+
+def recorded_clubs(root: str) -> list[str]:
+    """The clubs whose profile page was recorded under root."""
+    if not os.path.isdir(root):
+        return []
+    return sorted(name for name in os.listdir(root)
+                  if name not in POST_DIRECTORIES and os.path.isfile(os.path.join(root, name, FIXTURE_FILE_NAME)))
+
+
+def _splice(shell: str, head: str, body: str) -> str:
+    head_index = shell.find("</head>")
+    shell = shell[:head_index] + head + shell[head_index:] if head_index != -1 else head + shell
+    body_index = shell.rfind("</body>")
+    return shell[:body_index] + body + shell[body_index:] if body_index != -1 else shell + body
+
+
+def write_synthetic_fixtures(root: str, clubs: int, posts: int) -> list[str]:
+    """
+    Writes profile and post pages shaped like recorded ones: the app shell of
+    debug_post_source.html with the markup the scraper reads spliced in.
+    :return: the club names
+    """
+    with open(os.path.join(REPO_ROOT, "debug_post_source.html"), 'r', encoding='utf-8', errors='replace') as file:
+        shell = file.read()
+
+    names = []
+    for club_index in range(clubs):
+        club = f"bench_club_{club_index}"
+        shortcodes = [f"B{club_index:02d}x{post_index:04d}" for post_index in range(posts)]
+        head = (f'<meta name="description" content="1,234 Followers, 56 Following, {posts} Posts - '
+                f'See Instagram photos and videos from Bench Club {club_index} (@{club})">'
+                f'<meta property="og:title" content="Bench Club {club_index} (@{club})">'
+                f'<meta property="og:image" content="https://example.com/{club}.jpg">')
+        body = "".join(f'<a href="/p/{code}/">post</a>' for code in shortcodes)
+        body += f'<a rel="me" href="https://example.com/{club}">example.com/{club}</a>'
+        _write(fixture_path(f"{INSTAGRAM_URL}/{club}/", root), _splice(shell, head, body))
+
+        for post_index, code in enumerate(shortcodes):
+            post = (f'<article><h1 class="{POST_CAPTION_CLASS}">Meeting {post_index} of {club} &amp; free pizza!</h1>'
+                    f'<time class="{POST_TIME_CLASS}" datetime="2025-01-{post_index % 28 + 1:02d}T{club_index % 24:02d}:'
+                    f'{post_index % 60:02d}:00.000Z">January</time>'
+                    f'<img class="{POST_IMAGE_CLASS}" src="https://example.com/{code}.jpg" alt=""></article>')
+            _write(fixture_path(f"{INSTAGRAM_URL}/p/{code}/", root), _splice(shell, "", post))
+        names.append(club)
+    return names
+
+
+def _write(path: str, html: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(html)
+
+
+def _serve(root: str, queue, stop) -> None:
+    with ReplayServer(root) as server:
+        queue.put(server.base_url)
+        stop.wait()
+
+
+def start_replay(root: str):
+    """:return: (base URL, stop event, process) of a ReplayServer running in its own process"""
+    context = multiprocessing.get_context("spawn")
+    queue, stop = context.Queue(), context.Event()
+    process = context.Process(target=_serve, args=(root, queue, stop), daemon=True)
+    process.start()
+    return queue.get(), stop, process
+
+
+class PhaseStats:
+    """Wall time, CPU time, pages and Python memory peak of one scraper method over a run."""
+
+    def __init__(self):
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.pages = 0
+        self.peaks = []
+
+    def measure(self, call, pages: int, trace_memory: bool):
+        if trace_memory:
+            tracemalloc.reset_peak()
+            start_current = tracemalloc.get_traced_memory()[0]
+        wall, cpu = time.perf_counter(), time.process_time()
+        result = call()
+        self.wall += time.perf_counter() - wall
+        self.cpu += time.process_time() - cpu
+        self.pages += pages
+        if trace_memory:
+            self.peaks.append(tracemalloc.get_traced_memory()[1] - start_current)
+        return result
+
+
+def run_once(base_url: str, clubs: list[str], trace_memory: bool) -> tuple[dict, dict]:
+    """
+    Scrapes every club into a fresh data directory, so save_post_info stores every post.
+    :return: ({phase: PhaseStats}, {"clubs failed": n, "posts without date": n})
+    """
+    phases = {phase: PhaseStats() for phase in PHASES}
+    failures = {"clubs failed": 0, "posts without date": 0}
+    data_dir = tempfile.mkdtemp(prefix="scraper-bench-data-")
+    fetcher = HttpFetcher(base_url=base_url)
+    scraper = InstagramScraper(None, None, http_fetcher=fetcher, data_dir=data_dir, browser=False)
+    try:
+        for club in clubs:
+            club_info = phases["get_club_info"].measure(lambda: scraper.get_club_info(club), 1, trace_memory)
+            if not club_info:
+                failures["clubs failed"] += 1
+                continue
+            scraper.save_club_info(club_info)
+            links = club_info[0]["Recent Posts"]
+
+            posts = phases["get_post_info"].measure(lambda: [scraper.get_post_info(link) for link in links],
+                                                    len(links), trace_memory)
+            failures["posts without date"] += sum(1 for _, date, _ in posts if not date)
+            phases["save_post_info"].measure(lambda: scraper.save_post_info(club), len(links), trace_memory)
+    finally:
+        fetcher.session.close()
+        shutil.rmtree(data_dir, ignore_errors=True)
+    return phases, failures
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--fixtures", default=FIXTURES_DIR, help="recorded pages (default: repo fixtures/)")
+    arg_parser.add_argument("--synthetic", type=int, default=0,
+                            help="use N synthetic clubs instead (default: 3 when no club is recorded)")
+    arg_parser.add_argument("--posts", type=int, default=SYNTHETIC_POSTS, help="posts per synthetic club")
+    arg_parser.add_argument("--runs", type=int, default=DEFAULT_RUNS)
+    arg_parser.add_argument("--verbose", action="store_true", help="keep the scraper's info logging")
+    args = arg_parser.parse_args()
+
+    if not args.verbose:
+        logger.setLevel(logging.WARNING)
+
+    root, synthetic_root = args.fixtures, None
+    clubs = [] if args.synthetic else recorded_clubs(root)
+    if not clubs:
+        synthetic_root = root = tempfile.mkdtemp(prefix="scraper-bench-fixtures-")
+        clubs = write_synthetic_fixtures(root, args.synthetic or 3, args.posts)
+        print(f"Using {len(clubs)} synthetic clubs with {args.posts} posts each")
+    else:
+        print(f"Using {len(clubs)} recorded clubs from {root}")
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    base_url, stop, process = start_replay(root)
+    try:
+        run_once(base_url, clubs[:1], trace_memory=False)  # warm-up: imports, patterns, connections
+        runs = [run_once(base_url, clubs, trace_memory=False) for _ in range(args.runs)]
+
+        tracemalloc.start()
+        memory, failures = run_once(base_url, clubs, trace_memory=True)
+        tracemalloc.stop()
+        rss_growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+    finally:
+        stop.set()
+        process.join()
+        if synthetic_root:
+            shutil.rmtree(synthetic_root, ignore_errors=True)
+
+    print(f"{args.runs} runs, medians; memory from one traced run\n")
+    print(f"{'phase':<16} {'pages':>6} {'pages/s':>9} {'wall ms/club':>13} {'CPU ms/club':>12} {'py peak KB/club':>16}")
+    for phase in PHASES:
+        stats = [phases[phase] for phases, _ in runs]
+        wall = statistics.median(stat.wall for stat in stats)
+        cpu = statistics.median(stat.cpu for stat in stats)
+        pages = stats[0].pages
+        peak = statistics.median(memory[phase].peaks) / 1024 if memory[phase].peaks else 0.0
+        print(f"{phase:<16} {pages:>6} {pages / wall if wall else 0:>9.1f} {wall * 1000 / len(clubs):>13.1f} "
+              f"{cpu * 1000 / len(clubs):>12.1f} {peak:>16.1f}")
+
+    # ru_maxrss is in KB on Linux, bytes on macOS
+    print(f"\nPeak RSS growth over the benchmark: {rss_growth / 1024 if sys.platform != 'darwin' else rss_growth / 2 ** 20:.1f} MB")
+    for name, count in failures.items():
+        if count:
+            print(f"  ! {count} {name}")
+
+
+if __name__ == "__main__":
+    main()
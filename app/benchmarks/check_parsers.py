@@ -0,0 +1,127 @@
+"""
+Checks parse_profile_page and parse_post_page against pages whose contents are known, with every HTML extractor backend.
+
+    python app/benchmarks/check_parsers.py [--fixtures DIR]
+
+Synthetic clubs from benchmark_scraper must parse to exactly the fields they were written with,
+pages carrying only Instagram's embedded JSON must parse from that, and the unhydrated app shell
+(debug_post_source.html) must parse to None. Clubs recorded under --fixtures are checked to parse
+at all. Exits non-zero on any mismatch; nothing leaves the machine.
+"""
+import argparse
+import logging
+import os
+import shutil
+import sys
+import tempfile
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from tools.logger import logger
+from tools.fixtures import FIXTURES_DIR, fixture_path
+from tools.page_fetcher import INSTAGRAM_URL, parse_post_page, parse_profile_page
+from tools.extractors import available_extractors, get_extractor
+from benchmark_scraper import REPO_ROOT, recorded_clubs, write_synthetic_fixtures
+
+SYNTHETIC_CLUBS = 2
+SYNTHETIC_POSTS = 3
+
+# Pages with the data only in the embedded JSON, as the app shell serves it to some sessions
+EMBEDDED_PROFILE = (
+    '<html><head><meta name="description" content="2,500 Followers, 10 Following, 2 Posts - Embedded club">'
+    '<meta property="og:title" content="Embedded Club (@embedded_club)">'
+    '<meta property="og:image" content="https://example.com/embedded.jpg"></head><body><script>'
+    '{"items":[{"shortcode":"Emb3dd3d1","code":"NotAPost99"},{"shortcode":"Emb3dd3d2"}]}'
+    '</script></body></html>'
+)
+EMBEDDED_POST = (
+    '<html><head></head><body><script>{"taken_at":1736906400,"caption":{"pk":"1","text":"Club fair \\u0026 games"},'
+    '"display_url":"https:\\/\\/example.com\\/embedded-post.jpg"}</script></body></html>'
+)
+
+
+def _read(path: str) -> str:
+    with open(path, 'r', encoding='utf-8', errors='replace') as file:
+        return file.read()
+
+
+def expected_club(club_index: int, posts: int) -> dict:
+    """The club_info write_synthetic_fixtures wrote for its club_index-th club."""
+    club = f"bench_club_{club_index}"
+    return {"Instagram Handle": club,
+            "Club Name": f"Bench Club {club_index}",
+            "Profile Picture": f"https://example.com/{club}.jpg",
+            "Description": [f"See Instagram photos and videos from Bench Club {club_index} (@{club})"],
+            "Followers": "1234",
+            "Following": "56",
+            "Post Count": str(posts),
+            "Club Links": [{"text": f"example.com/{club}", "url": f"https://example.com/{club}"}],
+            "Recent Posts": [f"{INSTAGRAM_URL}/p/B{club_index:02d}x{post_index:04d}/" for post_index in range(posts)]}
+
+
+def expected_post(club_index: int, post_index: int) -> tuple:
+    """The (description, date, picture) write_synthetic_fixtures wrote for a post."""
+    club = f"bench_club_{club_index}"
+    return (f"Meeting {post_index} of {club} & free pizza!",
+            f"2025-01-{post_index % 28 + 1:02d}T{club_index % 24:02d}:{post_index % 60:02d}:00.000Z",
+            f"https://example.com/B{club_index:02d}x{post_index:04d}.jpg")
+
+
+def check_backend(name: str, synthetic_root: str, recorded_root: str, recorded: list[str]) -> list[str]:
+    """:return: a description of every mismatch"""
+    extractor = get_extractor(name)
+    problems = []
+
+    def expect(label: str, actual, expected) -> None:
+        if actual != expected:
+            problems.append(f"{name}: {label} parsed to {actual!r}, expected {expected!r}")
+
+    for club_index in range(SYNTHETIC_CLUBS):
+        club = f"bench_club_{club_index}"
+        html = _read(fixture_path(f"{INSTAGRAM_URL}/{club}/", synthetic_root))
+        expect(club, parse_profile_page(html, club, extractor), expected_club(club_index, SYNTHETIC_POSTS))
+        for post_index in range(SYNTHETIC_POSTS):
+            url = f"{INSTAGRAM_URL}/p/B{club_index:02d}x{post_index:04d}/"
+            expect(url, parse_post_page(_read(fixture_path(url, synthetic_root)), extractor),
+                   expected_post(club_index, post_index))
+
+    embedded = parse_profile_page(EMBEDDED_PROFILE, "embedded_club", extractor)
+    expect("embedded profile posts", embedded and embedded["Recent Posts"],
+           [f"{INSTAGRAM_URL}/p/Emb3dd3d1/", f"{INSTAGRAM_URL}/p/Emb3dd3d2/"])
+    expect("embedded post", parse_post_page(EMBEDDED_POST, extractor),
+           ("Club fair & games", "2025-01-15T02:00:00.000Z", "https://example.com/embedded-post.jpg"))
+
+    shell = _read(os.path.join(REPO_ROOT, "debug_post_source.html"))
+    expect("debug_post_source.html as a post", parse_post_page(shell, extractor), None)
+    expect("debug_post_source.html as a profile", parse_profile_page(shell, "debug", extractor), None)
+
+    for club in recorded:
+        if parse_profile_page(_read(fixture_path(f"{INSTAGRAM_URL}/{club}/", recorded_root)), club, extractor) is None:
+            problems.append(f"{name}: recorded profile {club} did not parse")
+    return problems
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--fixtures", default=FIXTURES_DIR, help="recorded pages (default: repo fixtures/)")
+    args = arg_parser.parse_args()
+    logger.setLevel(logging.WARNING)
+
+    recorded = recorded_clubs(args.fixtures)
+    synthetic_root = tempfile.mkdtemp(prefix="parser-check-fixtures-")
+    try:
+        write_synthetic_fixtures(synthetic_root, SYNTHETIC_CLUBS, SYNTHETIC_POSTS)
+        problems = []
+        for name in available_extractors():
+            backend_problems = check_backend(name, synthetic_root, args.fixtures, recorded)
+            print(f"{name:<7} {'ok' if not backend_problems else f'{len(backend_problems)} mismatches'}")
+            problems += backend_problems
+    finally:
+        shutil.rmtree(synthetic_root, ignore_errors=True)
+
+    print(f"Checked {SYNTHETIC_CLUBS} synthetic and {len(recorded)} recorded clubs")
+    for problem in problems:
+        print(f"  ! {problem}")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
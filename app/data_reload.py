@@ -26,6 +26,10 @@ def main():
     logger.info("initiating ai and calendar file creation")
     for club in clubs:
         parser.parse_all_posts(club)
+        try:
+            retriver.create_club_bundle(club)
+        except FileNotFoundError as e:
+            logger.error(f"Unable to bundle {club}: {e}")
         cc.create_calendar_file(club)
         
     #s3_client.delete_data()
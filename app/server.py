@@ -1,14 +1,24 @@
 from io import BytesIO, StringIO
-from flask import Flask, request, jsonify, send_file, abort
+from flask import Flask, request, jsonify, send_file, abort, Response
 from tools.ai_validation import EventParser
 from tools.calendar_connection import CalendarConnection
-from tools.insta_scraper import InstagramScraper, multi_threaded_scrape
-from tools.data_retriever import DataRetriever
+from tools.insta_scraper import InstagramScraper
+from tools.process_scrape import run_scrape
+from tools.data_retriever import DataRetriever, POSTS_FILE_NAME, decode_posts_cursor
 from tools.s3_client import S3Client
+from tools.artifacts import get_artifact_meta, variant_etag
+from tools.club_hydrator import ClubHydrator, HydrationPending
+from tools.club_registry import ClubRegistry
+from tools.event_index import EventIndex, parse_event_time
+from tools.search_index import SearchIndex
+from tools.facet_index import FacetIndex
+from tools.scrape_journal import ScrapeJournal
+from tools.manifest_store import ManifestStore
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
 from threading import Lock
 from flask_cors import CORS
+from datetime import datetime, timedelta, timezone
 
 import dotenv
 import os
@@ -23,9 +33,40 @@ from tools.logger import logger
 calendar = CalendarConnection()
 retriever = DataRetriever()
 s3_client = S3Client()
+registry = ClubRegistry(retriever)
+hydrator = ClubHydrator(retriever, s3_client, registry)
+event_index = EventIndex(retriever)
+search_index = SearchIndex(retriever)
+facet_index = FacetIndex()
+manifest_store = ManifestStore(retriever)
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "*"}})  # Allow all origins temporarily (adjust for production)
 
+# Browser/proxy caching of the read endpoints; calendar apps poll far less often than the frontend
+CACHE_MAX_AGE = int(os.getenv('CACHE_MAX_AGE', 300))
+CALENDAR_CACHE_MAX_AGE = int(os.getenv('CALENDAR_CACHE_MAX_AGE', 3600))
+
+# Retry-After sent while a cold club is still being downloaded for another request
+HYDRATION_RETRY_AFTER = 2
+
+# Window and size limits of /events
+DEFAULT_EVENTS_WINDOW_DAYS = 7
+MAX_EVENTS = 1000
+
+# Most handles one /clubs/batch request may resolve
+MAX_BATCH_HANDLES = 50
+
+# Most clubs one merged calendar feed may combine
+MAX_MERGED_CALENDAR_CLUBS = 50
+
+# Result limits of /search
+DEFAULT_SEARCH_RESULTS = 20
+MAX_SEARCH_RESULTS = 100
+
+# Page sizes of /club/<username>/posts when it is called with limit/cursor/before/after
+DEFAULT_POSTS_PAGE_SIZE = 20
+MAX_POSTS_PAGE_SIZE = 100
+
 # Scheduler Configuration
 jobstores = {
     'default': SQLAlchemyJobStore(url='sqlite:///jobs.sqlite')
@@ -33,10 +74,12 @@ jobstores = {
 scheduler = BackgroundScheduler(jobstores=jobstores, daemon=True)
 job_running = False
 job_lock = Lock()
+# Worker throughput and per-step timings of the last scrape, shown by /job-status
+last_scrape_report = None
 
 # Job: Reload Data
 def reload_data():
-    global job_running
+    global job_running, last_scrape_report
     with job_lock:
         if job_running:
             logger.info("Reload data job already running.")
@@ -48,16 +91,23 @@ def reload_data():
     
         logger.info("objects have been initiated")
         
-        logger.info("initiating scraping with 1 threads")
-        multi_threaded_scrape(clubs, 1)
-        logger.info('successful scrape!')
         clubs = retriever.fetch_club_instagram_from_manifest()
-        parser = EventParser
+        parser = EventParser()
+
+        last_scrape_report = run_scrape(clubs)
+        logger.info('successful scrape!')
 
         logger.info("initiating ai and calendar file creation")
         for club in clubs:
             parser.parse_all_posts(club)
+            # pack the freshly parsed posts so the calendar and the routes read one file
+            try:
+                retriever.create_club_bundle(club)
+            except FileNotFoundError as e:
+                logger.error(f"Unable to bundle {club}: {e}")
             calendar.create_calendar_file(club)
+        # One merge for the whole reload instead of one per club
+        event_index.update_clubs(clubs)
             
         s3_client.delete_data()
         logger.info('s3 data has been deleted')
@@ -66,6 +116,12 @@ def reload_data():
 
         #create/append the new manifest accordingly
         retriever.create_list_of_clubs()
+        manifest_store.reload()
+        retriever.bump_generation()
+        calendar.invalidate_merged_calendars()
+        registry.reload()
+        search_index.build()
+        facet_index.build(manifest_store.current().entries)
     
         logger.info("completed.")
 
@@ -79,7 +135,8 @@ def reload_data():
 
 # Job: File Cleanup
 def file_cleanup():
-    base_dir = "../data"
+    base_dir = retriever.get_user_dir()
+    cleaned = []
     for root, _, files in os.walk(base_dir):
         if not root.endswith("posts"):
             continue
@@ -94,6 +151,19 @@ def file_cleanup():
                     logger.info(f"Removed: {file_path}")
                 except Exception as e:
                     logger.error(f"Error removing file {file_path}: {e}")
+            cleaned.append(os.path.basename(os.path.dirname(root)))
+
+    # The bundle, posts.json and the calendar still list the removed posts until they are rebuilt
+    for club in cleaned:
+        try:
+            retriever.create_club_bundle(club)
+        except FileNotFoundError as e:
+            logger.error(f"Unable to bundle {club}: {e}")
+        calendar.create_calendar_file(club)
+    if cleaned:
+        event_index.update_clubs(cleaned)
+        calendar.invalidate_merged_calendars()
+    retriever.bump_generation()
 
 
 # Add jobs to the scheduler
@@ -104,12 +174,167 @@ scheduler.add_job(
     file_cleanup, 'interval', days=1, misfire_grace_time=60, id='file_cleanup_job', replace_existing=True
 )
 
+# Seconds after startup at which a scrape interrupted by a restart is resumed
+RESUME_RELOAD_DELAY = 60
+
+
+def schedule_interrupted_reload():
+    """Resumes a scrape run that a restart or crash cut short instead of waiting for the next interval."""
+    try:
+        journal = ScrapeJournal()
+        run_id = journal.unfinished_run()
+        journal.close()
+    except Exception as e:
+        logger.error(f"Unable to read the scrape journal: {e}")
+        return
+    if run_id is not None:
+        logger.info(f"Scrape run {run_id} was interrupted; resuming it in {RESUME_RELOAD_DELAY}s.")
+        scheduler.add_job(reload_data, 'date', run_date=datetime.now() + timedelta(seconds=RESUME_RELOAD_DELAY),
+                          id='resume_reload_job', replace_existing=True)
+
+
 # Start Scheduler
 if os.environ.get("WERKZEUG_RUN_MAIN") == "true" or not app.debug:
     scheduler.start()
+    schedule_interrupted_reload()
 atexit.register(lambda: scheduler.shutdown())
 
 
+# Warm the local data directory from S3 in the background after a deploy/restart
+def start_warm_up():
+    try:
+        clubs = retriever.fetch_club_instagram_from_manifest()
+    except Exception as e:
+        logger.error(f"Unable to read the manifest for warm-up: {e}")
+        return
+    hydrator.start_warm_up(clubs, on_finished=rebuild_indexes)
+
+
+def rebuild_indexes():
+    event_index.build()
+    search_index.build()
+    facet_index.build(manifest_store.current().entries)
+
+
+if os.getenv('WARM_UP_ON_START', 'true').lower() == 'true' and (
+        os.environ.get("WERKZEUG_RUN_MAIN") == "true" or not app.debug):
+    start_warm_up()
+
+
+# Conditional requests
+def _is_not_modified(etag: str, last_modified: int) -> bool:
+    """Checks If-None-Match (preferred) or If-Modified-Since against pipeline-time validators."""
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    if request.if_modified_since:
+        return last_modified <= int(request.if_modified_since.timestamp())
+    return False
+
+
+def _negotiate_encoding(encodings) -> str:
+    """
+    The available Content-Encoding the client prefers by its q-values, or None for the plain body.
+    :param encodings: available encodings, in order of preference on ties
+    """
+    best = request.accept_encodings.best_match([*encodings, 'identity'], default='identity')
+    return None if best == 'identity' else best
+
+
+def _set_cache_control(response, max_age: int):
+    """The same caching directives on every 200 and 304; send_file's default no-cache is dropped."""
+    response.vary.add('Accept-Encoding')
+    response.cache_control.no_cache = None
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    response.cache_control.must_revalidate = True
+    return response
+
+
+def _set_validators(response, etag: str, last_modified: int, max_age: int):
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    return _set_cache_control(response, max_age)
+
+
+def _artifact_response(meta, mimetype, download_name=None, max_age=CACHE_MAX_AGE):
+    """
+    Answers 304 when the client's copy is current, otherwise the variant it prefers. Every
+    variant carries its own ETag and Vary: Accept-Encoding.
+    :param meta: an ArtifactMeta (variants are files), or a ManifestSnapshot or MemoryArtifact (variants are bytes)
+    """
+    encoding = _negotiate_encoding(meta.encodings)
+    etag = variant_etag(meta.etag, encoding)
+    if _is_not_modified(etag, meta.last_modified):
+        response = Response(status=304)
+    else:
+        source = meta.encodings[encoding] if encoding else meta.source
+        if isinstance(source, bytes):
+            response = Response(source, mimetype=mimetype)
+        else:
+            response = send_file(source, mimetype=mimetype, download_name=download_name,
+                                 conditional=False, etag=False)
+        if encoding:
+            response.content_encoding = encoding
+    return _set_validators(response, etag, meta.last_modified, max_age)
+
+
+def _conditional_response(path, build_response, mimetype='application/json', max_age=CACHE_MAX_AGE,
+                          download_name=None):
+    """
+    Answers with 304 from the artifact's .etag sidecar alone, otherwise streams the pipeline-written
+    file (precompressed when accepted). Falls back to build_response when the file has no validators.
+    :param path: the served file whose validators apply to this route
+    :param build_response: callable producing the full response
+    """
+    meta = get_artifact_meta(path)
+    if meta is not None:
+        return _artifact_response(meta, mimetype, download_name, max_age)
+    return _set_cache_control(app.make_response(build_response()), max_age)
+
+
+def _merged_calendar_response(handles: list[str], download_name: str):
+    """
+    Serves a cached multi-club .ics feed, hydrating any club that is not local yet. Clubs still
+    downloading are left out and the feed is marked partial (X-Calendar-Partial, no caching);
+    only when every club is pending is the request answered with 503.
+    """
+    clubs = []
+    pending = []
+    for handle, error in hydrator.ensure_many(handles).items():
+        if isinstance(error, HydrationPending):
+            pending.append(error)
+        elif error is None:
+            clubs.append(handle)
+        else:
+            logger.info(f"{handle} left out of {download_name}: {error}")
+    if not clubs:
+        if pending:
+            raise pending[0]
+        return jsonify({"message": "None of the requested clubs were found"}), 404
+    
+    merged = calendar.get_merged_calendar(clubs)
+    response = Response(merged.body, mimetype='text/calendar')
+    response.headers['Content-Disposition'] = f'inline; filename="{download_name}"'
+    response.set_etag(merged.etag)
+    if pending:
+        # The complete feed will differ, so nothing may keep this one
+        response.headers['X-Calendar-Partial'] = ", ".join(error.club_name for error in pending)
+        response.cache_control.no_store = True
+        response.retry_after = HYDRATION_RETRY_AFTER
+        return response
+    response.cache_control.public = True
+    response.cache_control.max_age = CALENDAR_CACHE_MAX_AGE
+    response.cache_control.must_revalidate = True
+    return response.make_conditional(request)
+
+
+def _hydration_pending_response(e: HydrationPending):
+    response = jsonify({"message": str(e)})
+    response.status_code = 503
+    response.retry_after = HYDRATION_RETRY_AFTER
+    return response
+
+
 # Routes
 @app.route('/')
 def home():
@@ -125,11 +350,12 @@ def club():
 @app.route("/club/<username>", methods=['GET'])
 def club_data(username):
     try:
-        if not retriever.club_data_exists(username):
-            s3_client.download_instagram_directory(username)
+        hydrator.ensure_local(username)
             
         logger.info(f"Fetching data for club: {username}")
-        return retriever.fetch_club_info(username)
+        return _artifact_response(retriever.get_club_artifact(username, 'club_info.json'), 'application/json')
+    except HydrationPending as e:
+        return _hydration_pending_response(e)
     except FileNotFoundError as e:
         return jsonify({"message": f"Club not found, {e}"}), 404
     except Exception as e:
@@ -140,11 +366,40 @@ def club_data(username):
 @app.route("/club/<username>/posts", methods=['GET'])
 def club_post_data(username):
     try:
-        if not retriever.club_data_exists(username):
-            s3_client.download_instagram_directory(username)
+        hydrator.ensure_local(username)
             
         logger.info(f"Fetching posts for club: {username}")
-        return retriever.fetch_club_posts(username)
+        page_args = ('limit', 'cursor', 'before', 'after')
+        if not any(arg in request.args for arg in page_args):
+            return _artifact_response(retriever.get_club_artifact(username, POSTS_FILE_NAME), 'application/json')
+        
+        try:
+            limit = min(int(request.args.get('limit', DEFAULT_POSTS_PAGE_SIZE)), MAX_POSTS_PAGE_SIZE)
+        except ValueError:
+            return jsonify({"message": "limit must be an integer"}), 400
+        if limit < 1:
+            return jsonify({"message": "limit must be positive"}), 400
+        
+        cursor = request.args.get('cursor')
+        if cursor:
+            try:
+                decode_posts_cursor(cursor)
+            except ValueError:
+                return jsonify({"message": "cursor is not valid"}), 400
+        before = request.args.get('before')
+        after = request.args.get('after')
+        
+        # A page is validated by the posts it was cut from, whatever posts.json on disk says
+        snapshot = retriever.get_club_snapshot(username)
+        posts = retriever.get_club_artifact(username, POSTS_FILE_NAME, snapshot)
+        if _is_not_modified(posts.etag, posts.last_modified):
+            response = Response(status=304)
+        else:
+            response = jsonify(retriever.fetch_club_posts_page(username, limit, cursor=cursor, before=before,
+                                                               after=after, snapshot=snapshot))
+        return _set_validators(response, posts.etag, posts.last_modified, CACHE_MAX_AGE)
+    except HydrationPending as e:
+        return _hydration_pending_response(e)
     except FileNotFoundError:
         return jsonify({"message": "Club posts not found"}), 404
     except Exception as e:
@@ -156,7 +411,7 @@ def club_post_data(username):
 def club_manifest():
     try:
         logger.info("Fetching club manifest.")
-        return jsonify(retriever.fetch_manifest())
+        return _artifact_response(manifest_store.current(), 'application/json')
     except Exception as e:
         logger.error(f"Error fetching club manifest: {e}")
         return jsonify({"message": f"Error: {e}"}), 500
@@ -165,19 +420,27 @@ def club_manifest():
 @app.route("/club/<username>/calendar.ics", methods=['GET'])
 def club_calendar(username):
     try:
-        if not retriever.club_data_exists(username):
-            s3_client.download_instagram_directory(username)
+        hydrator.ensure_local(username)
             
         logger.info(f"Fetching calendar for club: {username}")
         calendar_path = retriever.fetch_club_calendar(username)
         
-        return send_file(
-            calendar_path,  # File-like object containing the .ics content
-            download_name=f"{username}_calendar.ics",  # Name of the file when downloaded
-            as_attachment=False,  # Set to True if you want to force download
-            mimetype='text/calendar',  # MIME type for .ics files
+        return _conditional_response(
+            calendar_path,
+            lambda: send_file(
+                calendar_path,  # File-like object containing the .ics content
+                download_name=f"{username}_calendar.ics",  # Name of the file when downloaded
+                as_attachment=False,  # Set to True if you want to force download
+                mimetype='text/calendar',  # MIME type for .ics files
+                conditional=False,  # validators come from the pipeline-time .etag sidecar
+            ),
+            mimetype='text/calendar',
+            max_age=CALENDAR_CACHE_MAX_AGE,
+            download_name=f"{username}_calendar.ics",
         )
         
+    except HydrationPending as e:
+        return _hydration_pending_response(e)
     except FileNotFoundError as e:
         logger.error(f"Calendar file not found for {username}: {e}")
         abort(404, description="Calendar file not found")
@@ -186,6 +449,155 @@ def club_calendar(username):
         abort(500, description="Internal Server Error")
 
 
+@app.route("/calendar.ics", methods=['GET'])
+def merged_calendar():
+    """One feed for several clubs, e.g. /calendar.ics?clubs=hackatuci,icssc.uci"""
+    try:
+        handles = [value for arg in request.args.getlist('clubs') for value in arg.split(',') if value]
+        if not handles:
+            return jsonify({"message": "clubs is required"}), 400
+        if len(set(handles)) > MAX_MERGED_CALENDAR_CLUBS:
+            return jsonify({"message": f"At most {MAX_MERGED_CALENDAR_CLUBS} clubs per feed"}), 400
+        
+        return _merged_calendar_response(handles, "clubs_calendar.ics")
+    except HydrationPending as e:
+        return _hydration_pending_response(e)
+    except Exception as e:
+        logger.error(f"Error building merged calendar: {e}")
+        abort(500, description="Internal Server Error")
+
+
+@app.route("/calendar/category/<name>.ics", methods=['GET'])
+def category_calendar(name):
+    try:
+        if not facet_index.built:
+            facet_index.build(manifest_store.current().entries)
+        
+        handles = [club['instagram'] for club in facet_index.filter(categories=[name])['clubs']]
+        if not handles:
+            return jsonify({"message": f"No clubs in category {name}"}), 404
+        
+        return _merged_calendar_response(handles, f"{name}_calendar.ics")
+    except HydrationPending as e:
+        return _hydration_pending_response(e)
+    except Exception as e:
+        logger.error(f"Error building calendar for category {name}: {e}")
+        abort(500, description="Internal Server Error")
+
+
+@app.route("/events", methods=['GET'])
+def events():
+    """Upcoming events across all clubs, e.g. /events?from=2025-01-06&to=2025-01-13&category=Technology"""
+    try:
+        start = parse_event_time(request.args['from']) if 'from' in request.args else datetime.now(timezone.utc)
+        if start is None:
+            return jsonify({"message": "from and to must be ISO 8601 dates"}), 400
+        end = parse_event_time(request.args['to']) if 'to' in request.args else start + timedelta(days=DEFAULT_EVENTS_WINDOW_DAYS)
+        if end is None:
+            return jsonify({"message": "from and to must be ISO 8601 dates"}), 400
+        try:
+            limit = min(int(request.args.get('limit', MAX_EVENTS)), MAX_EVENTS)
+        except ValueError:
+            return jsonify({"message": "limit must be an integer"}), 400
+        if limit < 1:
+            return jsonify({"message": "limit must be positive"}), 400
+        
+        if not event_index.built:
+            event_index.build()
+        
+        results = event_index.query(start, end, category=request.args.get('category'),
+                                    genre=request.args.get('genre'), limit=limit)
+        return jsonify({"from": start.isoformat(), "to": end.isoformat(), "events": results})
+    except Exception as e:
+        logger.error(f"Error fetching events: {e}")
+        return jsonify({"message": f"Error: {e}"}), 500
+
+
+@app.route("/clubs", methods=['GET'])
+def clubs_by_facet():
+    """Manifest entries filtered by facets, e.g. /clubs?genre=Cultural and Social&category=Technology"""
+    try:
+        categories = [value for arg in request.args.getlist('category') for value in arg.split(',') if value]
+        
+        if not facet_index.built:
+            facet_index.build(manifest_store.current().entries)
+        
+        return jsonify(facet_index.filter(genre=request.args.get('genre'), categories=categories))
+    except Exception as e:
+        logger.error(f"Error filtering clubs: {e}")
+        return jsonify({"message": f"Error: {e}"}), 500
+
+
+@app.route("/clubs/batch", methods=['GET', 'POST'])
+def clubs_batch():
+    """
+    club_info for many clubs in one request: GET /clubs/batch?handles=a,b or POST {"handles": ["a", "b"]}.
+    Clubs that are not local yet are pulled from S3 in parallel.
+    """
+    try:
+        if request.method == 'POST':
+            payload = request.get_json(silent=True)
+            if not isinstance(payload, dict):
+                return jsonify({"message": "body must be a JSON object"}), 400
+            handles = payload.get('handles')
+            if not isinstance(handles, list) or not all(isinstance(handle, str) for handle in handles):
+                return jsonify({"message": "handles must be a list of strings"}), 400
+        else:
+            handles = [value for arg in request.args.getlist('handles') for value in arg.split(',') if value]
+        
+        handles = list(dict.fromkeys(handles))
+        if not handles:
+            return jsonify({"message": "handles is required"}), 400
+        if len(handles) > MAX_BATCH_HANDLES:
+            return jsonify({"message": f"At most {MAX_BATCH_HANDLES} handles per request"}), 400
+        
+        clubs, not_found, pending, failed = {}, [], [], []
+        for handle, error in hydrator.ensure_many(handles).items():
+            if isinstance(error, HydrationPending):
+                pending.append(handle)
+            elif isinstance(error, FileNotFoundError):
+                not_found.append(handle)
+            elif error is not None:
+                failed.append(handle)
+            else:
+                try:
+                    clubs[handle] = retriever.fetch_club_info(handle)
+                except FileNotFoundError:
+                    not_found.append(handle)
+        
+        response = jsonify({"clubs": clubs, "not_found": not_found, "pending": pending, "failed": failed})
+        if pending:
+            response.retry_after = HYDRATION_RETRY_AFTER
+        return response
+    except Exception as e:
+        logger.error(f"Error fetching club batch: {e}")
+        return jsonify({"message": f"Error: {e}"}), 500
+
+
+@app.route("/search", methods=['GET'])
+def search():
+    """Full-text search over clubs and events, e.g. /search?q=hack&type=club"""
+    try:
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({"message": "q is required"}), 400
+        try:
+            limit = min(int(request.args.get('limit', DEFAULT_SEARCH_RESULTS)), MAX_SEARCH_RESULTS)
+        except ValueError:
+            return jsonify({"message": "limit must be an integer"}), 400
+        if limit < 1:
+            return jsonify({"message": "limit must be positive"}), 400
+        
+        if not search_index.built:
+            search_index.build()
+        
+        results = search_index.search(query, limit=limit, doc_type=request.args.get('type'))
+        return jsonify({"query": query, "results": results})
+    except Exception as e:
+        logger.error(f"Error searching for {request.args.get('q')}: {e}")
+        return jsonify({"message": f"Error: {e}"}), 500
+
+
 @app.route("/job-status", methods=['GET'])
 def job_status():
     response = {}
@@ -195,6 +607,8 @@ def job_status():
             "job_id": job.id if job else "N/A",
             "next_run_time": str(job.next_run_time) if job else "N/A"
         }
+    response['warm_up'] = hydrator.warm_up_status()
+    response['last_scrape'] = last_scrape_report
     return jsonify(response)
 
 
@@ -0,0 +1,181 @@
+import gzip
+import hashlib
+import os
+import sys
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from tools.cache import LRUCache
+from tools.file_utils import atomic_write
+from tools.logger import logger
+
+try:
+    import brotli
+except ImportError:  # brotli variants are skipped, gzip is always available
+    brotli = None
+
+# Sidecar written next to every served file: "<etag>\n<last modified epoch seconds>"
+ETAG_SUFFIX = '.etag'
+
+# Content-Encoding -> file suffix of the precompressed variant, in order of preference
+ENCODING_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+_meta_cache = LRUCache(1024)
+
+
+class ArtifactMeta:
+    """Validators of a served file, computed when the reload pipeline wrote it."""
+
+    def __init__(self, path: str, etag: str, last_modified: int, stamp: tuple, encodings: dict):
+        self.path = path
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stamp = stamp
+        # Content-Encoding -> path of a precompressed variant of the same content
+        self.encodings = encodings
+
+    @property
+    def source(self) -> str:
+        """The uncompressed file."""
+        return self.path
+
+
+class MemoryArtifact:
+    """A served body held in memory with its validators and compressed variants. Treat as read-only."""
+
+    __slots__ = ('body', 'etag', 'last_modified', 'encodings')
+
+    def __init__(self, body: bytes, etag: str, last_modified: int, encodings: dict):
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        # Content-Encoding -> compressed body, in order of preference
+        self.encodings = encodings
+
+    @property
+    def source(self) -> bytes:
+        """The uncompressed body."""
+        return self.body
+
+
+def compute_etag(body: bytes) -> str:
+    """Strong, content-derived ETag value (unquoted)."""
+    return hashlib.sha256(body).hexdigest()[:32]
+
+
+def variant_etag(etag: str, encoding: str = None) -> str:
+    """
+    ETag of one encoding of a file. Each variant gets its own so that a strong validator
+    always identifies exact bytes (RFC 9110 8.8.3); the plain file keeps the bare value.
+    """
+    return f"{etag}-{encoding}" if encoding else etag
+
+
+def _compress(encoding: str, body: bytes):
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=9, mtime=0)
+    if encoding == 'br' and brotli is not None:
+        return brotli.compress(body, quality=11)
+    return None
+
+
+def stamp_artifact(path: str, body: bytes = None) -> str:
+    """
+    Hashes a served file and writes its precompressed variants and .etag sidecar.
+    The sidecar is written last so it is never older than anything it vouches for.
+    :param path: the served file
+    :param body: the file's bytes if the caller already has them
+    :return: the ETag value
+    """
+    if body is None:
+        with open(path, 'rb') as file:
+            body = file.read()
+
+    for encoding, suffix in ENCODING_SUFFIXES.items():
+        compressed = _compress(encoding, body)
+        if compressed is not None and len(compressed) < len(body):
+            atomic_write(path + suffix, compressed)
+        elif os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    etag = compute_etag(body)
+    atomic_write(path + ETAG_SUFFIX, f"{etag}\n{int(time.time())}\n")
+    _meta_cache.invalidate(path)
+    return etag
+
+
+def remove_artifact(path: str) -> None:
+    """Deletes a served file together with its variants and sidecar."""
+    for suffix in ('', *ENCODING_SUFFIXES.values(), ETAG_SUFFIX):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    _meta_cache.invalidate(path)
+
+
+def publish_artifact(path: str, body: bytes) -> str:
+    """Atomically writes a served file together with its validators."""
+    atomic_write(path, body)
+    return stamp_artifact(path, body)
+
+
+def load_memory_artifact(path: str, body: bytes, last_modified: int) -> MemoryArtifact:
+    """
+    Holds body in memory for serving. When the sidecar of path vouches for exactly these bytes,
+    its validators and precompressed variants are used; otherwise they are computed here, gzip only.
+    :param path: the served file body was (or would have been) written to
+    :param last_modified: epoch seconds, used when the sidecar does not match
+    """
+    etag = compute_etag(body)
+    meta = get_artifact_meta(path)
+    if meta is not None and meta.etag == etag:
+        encodings = {}
+        for encoding, variant_path in meta.encodings.items():
+            try:
+                with open(variant_path, 'rb') as file:
+                    encodings[encoding] = file.read()
+            except FileNotFoundError:
+                continue
+        return MemoryArtifact(body, etag, meta.last_modified, encodings)
+
+    compressed = _compress('gzip', body)
+    return MemoryArtifact(body, etag, last_modified,
+                          {'gzip': compressed} if len(compressed) < len(body) else {})
+
+
+def get_artifact_meta(path: str):
+    """
+    Returns the validators of a served file without reading the file itself, or None when
+    it has no sidecar or was rewritten after it was stamped (e.g. by the scraper mid-reload).
+    :param path: the served file
+    """
+    try:
+        artifact_mtime = os.stat(path).st_mtime_ns
+        sidecar_mtime = os.stat(path + ETAG_SUFFIX).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    if artifact_mtime > sidecar_mtime:
+        return None
+
+    stamp = (artifact_mtime, sidecar_mtime)
+    meta = _meta_cache.get(path)
+    if meta is not None and meta.stamp == stamp:
+        return meta
+
+    encodings = {}
+    for encoding, suffix in ENCODING_SUFFIXES.items():
+        try:
+            if os.stat(path + suffix).st_mtime_ns <= sidecar_mtime:
+                encodings[encoding] = path + suffix
+        except FileNotFoundError:
+            continue
+
+    try:
+        with open(path + ETAG_SUFFIX, 'r') as file:
+            etag, last_modified = file.read().split()
+        meta = ArtifactMeta(path, etag, int(last_modified), stamp, encodings)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Unreadable etag sidecar for {path}: {e}")
+        return None
+
+    _meta_cache.put(path, meta)
+    return meta
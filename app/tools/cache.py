@@ -0,0 +1,71 @@
+from collections import OrderedDict
+from threading import Lock
+
+
+class LRUCache:
+    """
+    Thread-safe, bounded LRU cache.
+
+    Every entry is stamped with the cache generation it was stored under; calling
+    `bump_generation` drops all existing entries at once without walking them.
+    """
+
+    def __init__(self, max_size: int = 128):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        self._generation = 0
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, key, default=None):
+        """
+        Return the cached value for `key`, marking it most recently used.
+
+        :param key: the cache key
+        :param default: value returned on a miss or a stale entry
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+
+            generation, value = entry
+            if generation != self._generation:
+                del self._entries[key]
+                return default
+
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value) -> None:
+        """Store `value` under `key`, evicting the least recently used entry if full."""
+        with self._lock:
+            self._entries[key] = (self._generation, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def bump_generation(self) -> int:
+        """Invalidate every entry currently in the cache and return the new generation."""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            return self._generation
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[0] == self._generation
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
@@ -1,72 +1,138 @@
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 import datetime
+import hashlib
 import os
 from ics import Calendar, Event
 import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from tools.logger import logger
 from tools.data_retriever import DataRetriever
+from tools.artifacts import stamp_artifact, compute_etag
+from tools.cache import LRUCache
+
+# Merged multi-club feeds kept in memory, keyed by the sorted set of clubs
+MERGED_CALENDAR_CACHE_SIZE = int(os.getenv('MERGED_CALENDAR_CACHE_SIZE', 512))
+# Domain part of the event UIDs
+EVENT_UID_DOMAIN = "instinct.calendar"
+
+
+def event_uid(club: str, name: str, begin) -> str:
+    """
+    Stable UID of an event. ics gives every Event() a random one, which made each rebuild of a
+    feed a new body and ETag, and made calendar clients drop and re-create every event.
+    """
+    digest = hashlib.sha256(f"{club}|{name}|{begin.isoformat()}".encode('utf-8')).hexdigest()[:32]
+    return f"{digest}@{EVENT_UID_DOMAIN}"
+
+
+class MergedCalendar:
+    """Serialized .ics body of a multi-club feed with its ETag."""
+
+    def __init__(self, clubs: tuple, body: bytes):
+        self.clubs = clubs
+        self.body = body
+        self.etag = compute_etag(body)
+
 
-3
 class CalendarConnection:
     def __init__(self):
         
         self.retriever = DataRetriever()
+        self.merged_cache = LRUCache(MERGED_CALENDAR_CACHE_SIZE)
         
     def create_calendar_file(self, username):
             # Define the path to the .ics file
    
             ics_path = os.path.join(self.retriever.get_user_dir(), username, "calendar_file.ics")
             
-            calendar = Calendar()
-            # Load the calendar file if it exists
-            
-
-            # Fetch post information
+            # Fetch the parsed events from the club's bundle
             try:
-                posts = self.retriever.fetch_club_posts(username)
+                snapshot = self.retriever.get_club_snapshot(username)
             except FileNotFoundError:
                 logger.error('club does not exist unable to create calendar file')
                 return
+            if not snapshot.posts:
+                logger.error(f'{username} has no posts, unable to create calendar file')
+                return
+            events = snapshot.events
 
-            # Add events to the calendar
-            for post in posts:
-                try:
-                    for event in post['Parsed']:
-                        try:
-                            new_event = Event()
-                            new_event.name = event['Name']
-                            new_event.begin = event['Date']  # Ensure this is in ISO 8601 or datetime format
-                            duration = event['Duration']['estimated duration']
-                            description = event['Details']
-                            
-                            # Add duration if provided
-                            if 'days' in duration or 'hours' in duration:
-                                days = duration.get('days', 0)
-                                hours = duration.get('hours', 0)
-                                total_seconds = (days * 86400) + (hours * 3600)
-                                new_event.duration = datetime.timedelta(seconds=total_seconds)
-                                
-                            new_event.description = description
-                            
-                            # Check for duplicates and add the event
-                            if not self.is_duplicate(new_event, calendar):
-                                calendar.events.add(new_event)
-                        except Exception as e:
-                            logger.error(f"Error while adding event: {e} for {username}")
-                except KeyError:
-                    continue
-                    
+            calendar = self.build_calendar(events, username)
 
             # Save the updated calendar to the .ics file
             with open(ics_path, 'w') as f:
                 f.writelines(calendar)
+            stamp_artifact(ics_path)
 
             logger.info(f"Calendar file successfully created/updated for {username}")
         
  
     
+    def build_calendar(self, events: list, username: str, label_clubs: bool = False) -> Calendar:
+        """
+        Builds a calendar from parsed event records (as stored in a club's bundle).
+        :param events: parsed events, each carrying the club it came from under 'Club'
+        :param username: what the feed is for, used in log messages
+        :param label_clubs: add the hosting club to each description, for multi-club feeds
+        """
+        calendar = Calendar()
+        seen = set()
+        for event in events:
+            try:
+                new_event = Event()
+                new_event.name = event['Name']
+                new_event.begin = event['Date']  # Ensure this is in ISO 8601 or datetime format
+                duration = event['Duration']['estimated duration']
+                description = event['Details']
+                
+                # Add duration if provided
+                if 'days' in duration or 'hours' in duration:
+                    days = duration.get('days', 0)
+                    hours = duration.get('hours', 0)
+                    total_seconds = (days * 86400) + (hours * 3600)
+                    new_event.duration = datetime.timedelta(seconds=total_seconds)
+                
+                if label_clubs and event.get('Club'):
+                    description = f"{description}\n\nHosted by @{event['Club']}"
+                new_event.description = description
+                new_event.uid = event_uid(event.get('Club') or username, new_event.name, new_event.begin)
+                
+                # Skip duplicates (same name and start), checked in O(1) per event
+                key = (new_event.name, new_event.begin)
+                if key not in seen:
+                    seen.add(key)
+                    calendar.events.add(new_event)
+            except Exception as e:
+                logger.error(f"Error while adding event: {e} for {username}")
+        
+        return calendar
+
+    def get_merged_calendar(self, usernames) -> MergedCalendar:
+        """
+        Returns one feed holding the events of several clubs, built from their bundled
+        event records and cached under the normalized set of clubs.
+        :param usernames: instagram tags of the clubs, in any order, duplicates allowed
+        """
+        clubs = tuple(sorted(set(usernames)))
+        merged = self.merged_cache.get(clubs)
+        if merged is not None:
+            return merged
+        
+        events = []
+        for username in clubs:
+            try:
+                events.extend(self.retriever.fetch_club_events(username))
+            except FileNotFoundError:
+                logger.warning(f"No data for {username}; left out of the merged calendar.")
+        
+        calendar = self.build_calendar(events, f"{len(clubs)} clubs", label_clubs=True)
+        merged = MergedCalendar(clubs, calendar.serialize().encode('utf-8'))
+        self.merged_cache.put(clubs, merged)
+        return merged
+
+    def invalidate_merged_calendars(self) -> None:
+        self.merged_cache.bump_generation()
+
     def check_for_presence_of_file(self, ics_path):
         return os.path.exists(ics_path)
     
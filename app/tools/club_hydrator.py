@@ -0,0 +1,259 @@
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from queue import Empty, Queue
+from threading import Event, Lock, Thread
+import dotenv
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from tools.logger import logger
+
+dotenv.load_dotenv()
+
+# How long a request waits on another request's download of the same club before giving up
+HYDRATION_WAIT_SECONDS = float(os.getenv('HYDRATION_WAIT_SECONDS', 10))
+# Concurrent S3 downloads used to warm the local data directory at startup
+WARM_UP_WORKERS = int(os.getenv('WARM_UP_WORKERS', 8))
+# Concurrent S3 downloads used by a single request that needs several cold clubs
+BATCH_HYDRATION_WORKERS = int(os.getenv('BATCH_HYDRATION_WORKERS', 8))
+
+
+class HydrationPending(Exception):
+    """Raised when a club is still being downloaded for another request."""
+
+    def __init__(self, club_name: str):
+        super().__init__(f"Data for {club_name} is still being downloaded")
+        self.club_name = club_name
+
+
+class _Hydration:
+    """A single in-flight download of one club, shared by every request waiting on it."""
+
+    def __init__(self):
+        self.done = Event()
+        self.error = None
+
+
+class ClubHydrator:
+    """
+    Pulls clubs that are missing locally from S3, running at most one download per club
+    at a time no matter how many requests ask for it concurrently.
+    """
+
+    def __init__(self, retriever, s3_client, registry=None, wait_timeout: float = HYDRATION_WAIT_SECONDS):
+        self.retriever = retriever
+        self.s3_client = s3_client
+        self.registry = registry
+        self.wait_timeout = wait_timeout
+        self._inflight = {}
+        self._lock = Lock()
+        self._warm_up = None
+
+    def ensure_local(self, club_name: str, wait_timeout: float = None) -> None:
+        """
+        Makes sure a club's data is on local disk, downloading it from S3 if needed.
+        :param club_name: the instagram tag of the club
+        :param wait_timeout: how long to wait on a download started by another request
+        :raises FileNotFoundError: the club is unknown or does not exist in S3 either
+        :raises HydrationPending: another request's download did not finish in time
+        """
+        # Unknown and recently-missing handles are rejected from memory, before any I/O
+        if self.registry is not None:
+            if not self.registry.is_known(club_name):
+                raise FileNotFoundError(f"{club_name} is not a known club")
+            if self.registry.is_missing(club_name):
+                raise FileNotFoundError(f"Directory for {club_name} not found")
+        
+        if self.retriever.club_data_exists(club_name):
+            return
+
+        with self._lock:
+            hydration = self._inflight.get(club_name)
+            if hydration is None and self.retriever.club_data_exists(club_name):
+                return  # finished by another request since the check above
+            is_leader = hydration is None
+            if is_leader:
+                hydration = _Hydration()
+                self._inflight[club_name] = hydration
+                # A request jumps the warm-up queue: it downloads the club right now instead
+                if self._warm_up is not None:
+                    self._warm_up.discard(club_name)
+
+        if is_leader:
+            self._hydrate(club_name, hydration)
+        elif not hydration.done.wait(self.wait_timeout if wait_timeout is None else wait_timeout):
+            raise HydrationPending(club_name)
+
+        if hydration.error is not None:
+            raise hydration.error
+        if not self.retriever.club_data_exists(club_name):
+            raise FileNotFoundError(f"Directory for {club_name} not found")
+
+    def ensure_many(self, club_names: list[str], max_workers: int = BATCH_HYDRATION_WORKERS) -> dict:
+        """
+        Makes sure several clubs are on local disk, downloading the cold ones in parallel.
+        :param club_names: instagram tags of the clubs; duplicates are ignored
+        :param max_workers: number of concurrent downloads
+        :return: {club: None when local, otherwise the exception ensure_local raised}
+        """
+        results = {}
+        cold = []
+        for club_name in dict.fromkeys(club_names):
+            if self.registry is not None and not self.registry.is_known(club_name):
+                results[club_name] = FileNotFoundError(f"{club_name} is not a known club")
+            elif self.retriever.club_data_exists(club_name):
+                results[club_name] = None
+            else:
+                cold.append(club_name)
+        
+        if cold:
+            with ThreadPoolExecutor(min(max_workers, len(cold))) as executor:
+                futures = {club_name: executor.submit(self.ensure_local, club_name) for club_name in cold}
+            for club_name, future in futures.items():
+                results[club_name] = future.exception()
+        
+        return results
+
+    def start_warm_up(self, clubs: list[str], max_workers: int = WARM_UP_WORKERS, on_finished=None):
+        """
+        Hydrates every club in the background with a bounded number of concurrent downloads.
+        Clubs requested while still queued are downloaded immediately by the request instead.
+        :param clubs: instagram tags of the clubs to warm, in order
+        :param max_workers: number of concurrent downloads
+        :param on_finished: called without arguments once every club has been processed
+        :return: the running WarmUp
+        """
+        warm_up = WarmUp(self, clubs, max_workers, on_finished)
+        with self._lock:
+            self._warm_up = warm_up
+        warm_up.start()
+        return warm_up
+
+    def warm_up_status(self):
+        with self._lock:
+            warm_up = self._warm_up
+        return warm_up.status() if warm_up is not None else None
+
+    def is_hydrating(self, club_name: str) -> bool:
+        with self._lock:
+            return club_name in self._inflight
+
+    def _hydrate(self, club_name: str, hydration: _Hydration) -> None:
+        try:
+            logger.info(f"Downloading {club_name} from S3...")
+            self.s3_client.download_instagram_directory(club_name, self.retriever.get_user_dir())
+            self.retriever.invalidate_club(club_name)
+            logger.info(f"Downloaded {club_name} from S3.")
+        except Exception as e:
+            logger.error(f"Unable to download {club_name} from S3: {e}")
+            if isinstance(e, FileNotFoundError) and self.registry is not None:
+                self.registry.mark_missing(club_name)
+            hydration.error = e
+        finally:
+            with self._lock:
+                self._inflight.pop(club_name, None)
+            hydration.done.set()
+
+
+class WarmUp:
+    """A background pass over the manifest that pulls every missing club from S3."""
+
+    def __init__(self, hydrator: ClubHydrator, clubs: list[str], max_workers: int, on_finished=None):
+        self.hydrator = hydrator
+        self.max_workers = max(1, max_workers)
+        self.on_finished = on_finished
+        self._queue = Queue()
+        self._pending = set()
+        for club in dict.fromkeys(clubs):
+            self._queue.put(club)
+            self._pending.add(club)
+        self._lock = Lock()
+        self._total = len(self._pending)
+        self._downloaded = 0
+        self._already_local = 0
+        self._taken_by_requests = 0
+        self._failed = 0
+        self._download_seconds = 0.0
+        self._started_at = None
+        self._finished_at = None
+        self._active_workers = 0
+
+    def start(self) -> None:
+        self._started_at = time.time()
+        self._active_workers = self.max_workers
+        logger.info(f"Warming {self._total} clubs with {self.max_workers} workers...")
+        for i in range(self.max_workers):
+            Thread(target=self._work, name=f"warm-up-{i}", daemon=True).start()
+
+    def discard(self, club_name: str) -> None:
+        """Removes a club that a request is about to download itself."""
+        with self._lock:
+            if club_name in self._pending:
+                self._pending.remove(club_name)
+                self._taken_by_requests += 1
+
+    def status(self) -> dict:
+        with self._lock:
+            done = self._downloaded + self._already_local + self._taken_by_requests + self._failed
+            end = self._finished_at or time.time()
+            return {
+                "total": self._total,
+                "done": done,
+                "downloaded": self._downloaded,
+                "already_local": self._already_local,
+                "taken_by_requests": self._taken_by_requests,
+                "failed": self._failed,
+                "running": self._finished_at is None,
+                "elapsed_seconds": round(end - self._started_at, 2) if self._started_at else 0,
+                "avg_download_seconds": round(self._download_seconds / self._downloaded, 3) if self._downloaded else None,
+            }
+
+    def _take(self):
+        while True:
+            try:
+                club_name = self._queue.get_nowait()
+            except Empty:
+                return None
+            with self._lock:
+                if club_name in self._pending:
+                    self._pending.remove(club_name)
+                    return club_name
+
+    def _work(self) -> None:
+        while (club_name := self._take()) is not None:
+            if self.hydrator.retriever.club_data_exists(club_name):
+                with self._lock:
+                    self._already_local += 1
+                continue
+
+            start = time.perf_counter()
+            try:
+                self.hydrator.ensure_local(club_name, wait_timeout=None)
+                with self._lock:
+                    self._downloaded += 1
+                    self._download_seconds += time.perf_counter() - start
+            except HydrationPending:
+                # a request started this download first and is still running it
+                with self._lock:
+                    self._taken_by_requests += 1
+            except Exception as e:
+                logger.warning(f"Warm-up of {club_name} failed: {e}")
+                with self._lock:
+                    self._failed += 1
+
+            status = self.status()
+            if status["done"] % 10 == 0:
+                logger.info(f"Warm-up progress: {status['done']}/{status['total']} clubs in {status['elapsed_seconds']}s")
+
+        with self._lock:
+            self._active_workers -= 1
+            is_last_worker = self._active_workers == 0
+            if is_last_worker:
+                self._finished_at = time.time()
+        if is_last_worker:
+            logger.info(f"Warm-up finished: {self.status()}")
+            if self.on_finished is not None:
+                try:
+                    self.on_finished()
+                except Exception as e:
+                    logger.error(f"Error after warm-up: {e}")
@@ -0,0 +1,91 @@
+import json
+import os
+import sys
+import time
+from threading import Lock
+import dotenv
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from tools.cache import LRUCache
+from tools.logger import logger
+
+dotenv.load_dotenv()
+
+# How long a handle that was not found in S3 is rejected without asking S3 again
+NEGATIVE_CACHE_TTL_SECONDS = float(os.getenv('NEGATIVE_CACHE_TTL_SECONDS', 600))
+NEGATIVE_CACHE_SIZE = 4096
+# How often the manifest files are checked for changes to the set of known handles
+KNOWN_CLUBS_REVALIDATE_SECONDS = 30
+
+
+class ClubRegistry:
+    """
+    In-memory set of the club handles listed in club_manifest.json and manifest.json,
+    plus a TTL'd negative cache of handles that turned out to have no data in S3.
+    """
+
+    def __init__(self, retriever, negative_ttl: float = NEGATIVE_CACHE_TTL_SECONDS):
+        self.retriever = retriever
+        self.negative_ttl = negative_ttl
+        self._missing = LRUCache(NEGATIVE_CACHE_SIZE)
+        self._known = frozenset()
+        self._signature = None
+        self._checked_at = None
+        self._lock = Lock()
+
+    def is_known(self, club_name: str) -> bool:
+        self._refresh_known()
+        return club_name in self._known
+
+    def known_clubs(self) -> frozenset:
+        self._refresh_known()
+        return self._known
+
+    def is_missing(self, club_name: str) -> bool:
+        expires_at = self._missing.get(club_name)
+        if expires_at is None:
+            return False
+        if time.monotonic() >= expires_at:
+            self._missing.invalidate(club_name)
+            return False
+        return True
+
+    def mark_missing(self, club_name: str) -> None:
+        self._missing.put(club_name, time.monotonic() + self.negative_ttl)
+
+    def reload(self) -> None:
+        """Re-read the manifests and forget every negative result; called after a data reload."""
+        self._missing.bump_generation()
+        with self._lock:
+            self._checked_at = None
+        self._refresh_known()
+
+    def _manifest_paths(self) -> tuple:
+        return self.retriever.get_club_manifest_path(), self.retriever.get_manifest_path()
+
+    def _refresh_known(self) -> None:
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < KNOWN_CLUBS_REVALIDATE_SECONDS:
+            return
+
+        with self._lock:
+            if self._checked_at is not None and now - self._checked_at < KNOWN_CLUBS_REVALIDATE_SECONDS:
+                return
+
+            signature = tuple(os.stat(path).st_mtime_ns if os.path.exists(path) else None
+                              for path in self._manifest_paths())
+            if signature != self._signature:
+                self._known = self._load_known()
+                self._signature = signature
+                logger.info(f"{len(self._known)} known club handles loaded.")
+            self._checked_at = now
+
+    def _load_known(self) -> frozenset:
+        known = set()
+        for path in self._manifest_paths():
+            try:
+                with open(path, 'r') as file:
+                    known.update(club['instagram'] for club in json.load(file))
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                # manifest.json can be mid-rewrite; keep whatever the other file provides
+                logger.warning(f"Unable to read club handles from {path}: {e}")
+        return frozenset(known)
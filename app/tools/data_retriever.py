@@ -1,32 +1,288 @@
+import base64
 import os
 import json
+import time
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import dotenv
 import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from tools.logger import logger
+from tools.cache import LRUCache
+from tools.file_utils import atomic_write_json, dump_json_bytes
+from tools.artifacts import MemoryArtifact, load_memory_artifact, publish_artifact, stamp_artifact, remove_artifact
+
+dotenv.load_dotenv()
+
+# How many clubs are kept in memory, and how long a cached snapshot is trusted
+# before the mtimes of its files are checked again.
+CLUB_CACHE_SIZE = int(os.getenv('CLUB_CACHE_SIZE', 256))
+CLUB_CACHE_REVALIDATE_SECONDS = float(os.getenv('CLUB_CACHE_REVALIDATE_SECONDS', 30))
+
+# Shared by every DataRetriever in the process so that the reload job and the
+# request handlers see the same snapshots and the same generation.
+_club_cache = LRUCache(CLUB_CACHE_SIZE)
+
+# Threads used to validate clubs while building manifest.json
+MANIFEST_BUILD_WORKERS = 8
+
+# Packed per-club posts and events written at the end of the reload pipeline
+BUNDLE_FILE_NAME = 'posts.bundle.json'
+# Pre-serialized body of the /club/<username>/posts route
+POSTS_FILE_NAME = 'posts.json'
+
+
+def encode_posts_cursor(date: str, skip: int) -> str:
+    """Opaque cursor: the last returned post's date and how many posts of that date were returned."""
+    return base64.urlsafe_b64encode(json.dumps([date, skip]).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_posts_cursor(cursor: str) -> tuple:
+    """:raises ValueError: when the cursor was not produced by encode_posts_cursor"""
+    try:
+        date, skip = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"invalid cursor: {cursor}") from e
+    if not isinstance(date, str) or not isinstance(skip, int) or skip < 0:
+        raise ValueError(f"invalid cursor: {cursor}")
+    return date, skip
+
+
+class ClubSnapshot:
+    """In-memory copy of a club's info, posts (newest first) and parsed events. Treat as read-only."""
+
+    def __init__(self, info, posts, events, signature, info_body: bytes = None, modified: int = 0):
+        self.info = info
+        self.posts = posts
+        self.events = events
+        self.signature = signature
+        self.checked_at = time.monotonic()
+        # Post dates oldest first, for bisecting date cursors against the newest-first posts
+        self.ascending_dates = [post.get('Date', '') for post in reversed(posts)]
+        # club_info.json as read, and the newest mtime (epoch seconds) of the files this was loaded from
+        self.info_body = info_body
+        self.modified = modified
+        # Served file name -> MemoryArtifact, filled on first request, see DataRetriever.get_club_artifact
+        self.artifacts = {}
+
 
 class DataRetriever:
     def __init__(self):
         dotenv.load_dotenv()
         self.working_path = os.path.join(os.path.dirname(__file__), '..', '..')
+        self.club_cache = _club_cache
 
     def get_user_dir(self):
         return os.path.join(self.working_path, 'data')
     
+    def club_file_path(self, club_name, file_name):
+        return os.path.join(self.get_user_dir(), club_name, file_name)
+
+    def get_manifest_path(self):
+        return os.path.join(self.working_path, 'manifest.json')
+
+    def get_club_manifest_path(self):
+        return os.path.join(self.working_path, 'club_manifest.json')
+    
     def club_data_exists(self, club_name):
         return os.path.exists(os.path.join(self.working_path, 'data', club_name)) and os.path.exists(os.path.join(self.working_path, 'data', club_name, "posts"))
     
     def fetch_club_info(self, club_name):
+        snapshot = self.get_club_snapshot(club_name)
+        if snapshot.info is None:
+            raise FileNotFoundError(f"club_info.json for {club_name} not found")
+        
+        return snapshot.info
+
+    def get_club_snapshot(self, club_name) -> ClubSnapshot:
+        """
+        Returns the cached snapshot of a club, loading it from disk on a miss.
+        A cached snapshot is served without any disk access until it is older than
+        CLUB_CACHE_REVALIDATE_SECONDS, after which the mtimes of its files are compared.
+        :param club_name: the instagram tag of the club
+        """
+        snapshot = self.club_cache.get(club_name)
+        if snapshot is not None:
+            if time.monotonic() - snapshot.checked_at < CLUB_CACHE_REVALIDATE_SECONDS:
+                return snapshot
+            
+            if self._club_signature(club_name) == snapshot.signature:
+                snapshot.checked_at = time.monotonic()
+                return snapshot
+            
+            logger.info(f'cached data for {club_name} is stale, reloading.')
+        
+        snapshot = self._load_club_snapshot(club_name)
+        self.club_cache.put(club_name, snapshot)
+        return snapshot
+
+    def invalidate_club(self, club_name) -> None:
+        """Drop a single club from the in-memory cache, e.g. after its files were rewritten."""
+        self.club_cache.invalidate(club_name)
+
+    def bump_generation(self) -> int:
+        """Invalidate every cached club; called once the reload job has rewritten the data directory."""
+        generation = self.club_cache.bump_generation()
+        logger.info(f'club cache generation bumped to {generation}.')
+        return generation
+
+    def _post_files(self, club_name) -> list:
+        """:return: (name, mtime_ns, size) of every post file of a club, by name; None without a posts dir"""
+        try:
+            with os.scandir(os.path.join(self.get_user_dir(), club_name, 'posts')) as entries:
+                return sorted((entry.name, entry.stat().st_mtime_ns, entry.stat().st_size) for entry in entries)
+        except FileNotFoundError:
+            return None
+
+    def _club_signature(self, club_name, post_files: list = None) -> tuple:
+        """:param post_files: the club's _post_files if the caller already listed them"""
+        club_dir = os.path.join(self.get_user_dir(), club_name)
+        signature = []
+        for path in (club_dir, os.path.join(club_dir, 'posts'), os.path.join(club_dir, 'club_info.json'),
+                     os.path.join(club_dir, BUNDLE_FILE_NAME)):
+            try:
+                signature.append(os.stat(path).st_mtime_ns)
+            except FileNotFoundError:
+                signature.append(None)
+        
+        # A post rewritten in place changes neither directory's mtime, so every post file counts
+        post_files = post_files if post_files is not None else self._post_files(club_name)
+        signature.append(hash(tuple(post_files)) if post_files is not None else None)
+        
+        return tuple(signature)
+
+    def _load_club_snapshot(self, club_name) -> ClubSnapshot:
         if not self.club_data_exists(club_name):
             raise FileNotFoundError(f"Directory for {club_name} not found")
         
-        # Load the club data
-        with open(os.path.join(self.working_path, 'data', club_name, 'club_info.json'), 'r') as file:
-            club_data = json.load(file)
+        # Taken before reading so that a concurrent write shows up as stale on the next check
+        post_files = self._post_files(club_name)
+        signature = self._club_signature(club_name, post_files)
+        
+        # The small club_info.json is read on its own since the scraper rewrites it in place
+        modified = [mtime for _, mtime, _ in post_files or []]
+        try:
+            with open(self.club_file_path(club_name, 'club_info.json'), 'rb') as file:
+                info_body = file.read()
+                modified.append(os.fstat(file.fileno()).st_mtime_ns)
+            info = json.loads(info_body)
+        except FileNotFoundError:
+            info_body = info = None
+        
+        bundle = self._read_fresh_bundle(club_name, post_files)
+        if bundle is not None:
+            # One read for every post
+            logger.info(f'club data for {club_name} successfully fetched from bundle.')
+        else:
+            bundle = self._build_club_bundle(club_name)
             logger.info(f'club data for {club_name} successfully fetched.')
+        return ClubSnapshot(info, bundle['posts'], bundle['events'], signature, info_body,
+                            max(modified) // 10 ** 9 if modified else 0)
+
+    def _read_fresh_bundle(self, club_name, post_files: list):
+        """
+        Returns posts.bundle.json when it was built from exactly the post files the club has now
+        (same names and sizes), so posts scraped, parsed or deleted since the last reload are not
+        hidden by it. Mtimes are not compared: hydration from S3 gives every file a new one.
+        :return: the bundle, or None when it is missing, of an older layout or stale
+        """
+        try:
+            with open(self.club_file_path(club_name, BUNDLE_FILE_NAME), 'r') as file:
+                bundle = json.load(file)
+        except FileNotFoundError:
+            return None
         
-        return club_data
+        if bundle.get('post_files') != [[name, size] for name, _, size in post_files or []]:
+            logger.info(f'bundle of {club_name} does not match its post files, reading them.')
+            return None
+        return bundle
+
+    def _build_club_bundle(self, club_name) -> dict:
+        """Reads every post file of a club into the bundle layout."""
+        posts_dir = os.path.join(self.get_user_dir(), club_name, 'posts')
+        posts = []
+        for post in os.listdir(posts_dir):
+            with open(os.path.join(posts_dir, post), 'r') as file:
+                posts.append(json.load(file))
+        
+        # ISO 8601 dates sort chronologically as strings; posts sharing a date are ordered by
+        # their content so that pages and cursors are deterministic
+        posts.sort(key=lambda post: (post.get('Date', ''), str(post.get('Picture', '')), str(post.get('Description', ''))),
+                   reverse=True)
+        
+        events = []
+        for post in posts:
+            for event in post.get('Parsed') or []:
+                events.append({**event, 'Club': club_name, 'Post Date': post.get('Date', '')})
+        
+        return {'posts': posts, 'events': events}
+
+    def create_club_bundle(self, club_name) -> None:
+        """
+        Packs a club's sorted posts and parsed events into posts.bundle.json, together with the
+        post files they were read from, so that readers need a single read for all posts; writes
+        the posts route body as posts.json.
+        Run after the club's posts have been parsed.
+        :param club_name: the instagram tag of the club
+        """
+        if not self.club_data_exists(club_name):
+            raise FileNotFoundError(f"Directory for {club_name} not found")
+        
+        # Listed before reading, so a post written meanwhile leaves the bundle stale rather than wrong
+        post_files = self._post_files(club_name)
+        bundle = self._build_club_bundle(club_name)
+        atomic_write_json(self.club_file_path(club_name, BUNDLE_FILE_NAME),
+                          {'post_files': [[name, size] for name, _, size in post_files or []],
+                           'posts': bundle['posts'], 'events': bundle['events']})
+        if bundle['posts']:
+            publish_artifact(self.club_file_path(club_name, POSTS_FILE_NAME), dump_json_bytes(bundle['posts']))
+        else:
+            remove_artifact(self.club_file_path(club_name, POSTS_FILE_NAME))
+        if os.path.exists(self.club_file_path(club_name, 'club_info.json')):
+            stamp_artifact(self.club_file_path(club_name, 'club_info.json'))
+        self.invalidate_club(club_name)
+        logger.info(f'bundle for {club_name} written with {len(bundle["posts"])} posts and {len(bundle["events"])} events.')
+
+    def fetch_club_posts_page(self, club_name, limit: int, cursor: str = None, before: str = None,
+                              after: str = None, snapshot: ClubSnapshot = None) -> dict:
+        """
+        Returns a page of a club's posts, newest first, from the date-sorted snapshot.
+        :param club_name: the instagram tag of the club
+        :param limit: maximum number of posts to return
+        :param cursor: next_cursor of the previous page; posts sharing a date across the page
+            boundary are neither skipped nor repeated
+        :param before: only posts strictly older than this ISO date
+        :param after: only posts strictly newer than this ISO date
+        :param snapshot: the snapshot to page through, if the caller already holds one
+        :return: {"posts": [...], "next_cursor": cursor for the next page, or None}
+        :raises ValueError: on a malformed cursor
+        """
+        snapshot = snapshot or self.get_club_snapshot(club_name)
+        if not snapshot.posts:
+            raise FileNotFoundError(f"No posts found for {club_name}")
+        
+        dates = snapshot.ascending_dates
+        total = len(dates)
+        if cursor:
+            date, skip = decode_posts_cursor(cursor)
+            # Posts of that date sit at [total - bisect_right, total - bisect_left) in the newest-first list
+            start = min(total - bisect_right(dates, date) + skip, total - bisect_left(dates, date))
+        else:
+            start = total - bisect_left(dates, before) if before else 0
+        end = total - bisect_right(dates, after) if after else total
+        
+        stop = min(end, start + limit)
+        page = snapshot.posts[start:stop]
+        next_cursor = None
+        if page and stop < end:
+            date = page[-1].get('Date', '')
+            next_cursor = encode_posts_cursor(date, stop - (total - bisect_right(dates, date)))
+        return {'posts': page, 'next_cursor': next_cursor}
+
+    def fetch_club_events(self, club_name) -> list:
+        """Returns every parsed event of a club, newest post first."""
+        return self.get_club_snapshot(club_name).events
     
     def validate_club_is_ok(self, club_name: str):
         if not self.club_data_exists(club_name):
@@ -41,70 +297,112 @@ class DataRetriever:
         
         return True
         
-    def delete_data_from_manifest(self):
-        file_path = os.path.join(self.working_path, 'manifest.json')
+    def create_list_of_clubs(self, incremental: bool = True, max_workers: int = MANIFEST_BUILD_WORKERS) -> list:
+        """
+        Builds manifest.json (the home page list) from club_manifest.json and every valid club's
+        club_info.json. The whole list is assembled in memory, clubs are validated in parallel,
+        and the file is written once through a temp file and rename, so readers never see a
+        partial manifest.
+        :param incremental: reuse the previous entry of clubs whose club_info.json is unchanged
+        :param max_workers: threads used to validate and read clubs
+        :return: the manifest entries
+        """
+        club_data = self.fetch_club_manifest()
+        previous = self._load_manifest_state() if incremental else {}
         
-        if os.path.exists(file_path):
-            
-            with open(file_path, 'w') as file:
-                file.truncate(0)  # Truncate the file to 0 bytes
-            logger.info(f"All data in {file_path} has been deleted.")
-        else:
-            logger.info(f"The file {file_path} does not exist.")
-    
-    def create_list_of_clubs(self):
-        # this is the actual manifest
-        club_manifest_path = os.path.join(self.working_path, 'club_manifest.json')
-        # joker manifest; used for home page route
-        home_path = os.path.join(self.working_path, 'manifest.json')
-        
-        with open(club_manifest_path, 'r') as file:
-            club_data = json.load(file)
-        try: 
-            self.delete_data_from_manifest()
+        with ThreadPoolExecutor(max_workers) as executor:
+            results = list(executor.map(lambda club: self._build_manifest_entry(club, previous), club_data))
+        
+        entries = []
+        state = {}
+        reused = 0
+        for entry, club_state, unchanged in results:
+            if entry is None:
+                continue
+            entries.append(entry)
+            state[entry['instagram']] = club_state
+            reused += unchanged
+        
+        # Served as-is by /club-manifest, with its compressed variants and ETag
+        publish_artifact(self.get_manifest_path(), dump_json_bytes(entries))
+        atomic_write_json(self._manifest_state_path(), state)
+        
+        logger.info(f"Manifest written with {len(entries)} clubs ({reused} unchanged).")
+        return entries
+
+    def _build_manifest_entry(self, club: dict, previous: dict):
+        """Returns (manifest entry, state for the next incremental build, whether it was reused) for one club."""
+        handle = club['instagram']
+        if not self.validate_club_is_ok(handle):
+            return None, None, False
+        
+        info_path = self.club_file_path(handle, 'club_info.json')
+        try:
+            stat = os.stat(info_path)
         except FileNotFoundError:
-            logger.info('home file successfully created.')
-        
-        with open(home_path, 'w') as f:
-                json.dump([], f)
-                
-        
-        for idx, club in enumerate(club_data, start=1):
-            if self.validate_club_is_ok(club['instagram']):
-                curr = self.fetch_club_info(club['instagram'])
-                info = {'name': club['name'], 
-                        'genre': club['genre'],
-                        'instagram': club['instagram'],
-                        'categories': club['categories'],
-                        'pfp': curr['Profile Picture'],
-                        'description': curr['Description']
-                        }
-                
-                with open(home_path, 'r') as f:
-                    data = json.load(f)
-                
-                data.append(info)
-                
-                with open(home_path, 'w') as file:
-                    json.dump(data, file, indent=4) 
-                
-                
+            return None, None, False
+        signature = [stat.st_mtime_ns, stat.st_size]
+        
+        known = previous.get(handle)
+        if known is not None and known.get('signature') == signature:
+            pfp, description, reused = known['pfp'], known['description'], True
+        else:
+            with open(info_path, 'r') as file:
+                curr = json.load(file)
+            pfp, description, reused = curr['Profile Picture'], curr['Description'], False
+        
+        entry = {'name': club['name'], 
+                 'genre': club['genre'],
+                 'instagram': handle,
+                 'categories': club['categories'],
+                 'pfp': pfp,
+                 'description': description
+                 }
+        return entry, {'signature': signature, 'pfp': pfp, 'description': description}, reused
+
+    def _manifest_state_path(self):
+        return os.path.join(self.working_path, 'manifest.state.json')
+
+    def _load_manifest_state(self) -> dict:
+        try:
+            with open(self._manifest_state_path(), 'r') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
     
-    def fetch_club_posts(self, club_name):
-        if not self.club_data_exists(club_name):
-            raise FileNotFoundError(f"Directory for {club_name} not found")
+    def get_club_artifact(self, club_name, file_name: str, snapshot: ClubSnapshot = None) -> MemoryArtifact:
+        """
+        The body of club_info.json or posts.json as the routes serve it, with its validators and
+        compressed variants, kept in the club's snapshot so hot clubs are answered from memory.
+        It always matches the snapshot's content, even while the files on disk are ahead of the
+        pipeline-written artifact.
+        :param file_name: 'club_info.json' or POSTS_FILE_NAME
+        :param snapshot: the snapshot to serve from, if the caller already holds one
+        :raises FileNotFoundError: when the club has no info or no posts
+        """
+        snapshot = snapshot or self.get_club_snapshot(club_name)
+        artifact = snapshot.artifacts.get(file_name)
+        if artifact is not None:
+            return artifact
         
-        if not os.listdir(os.path.join(self.working_path, 'data', club_name, "posts")):
+        if file_name == POSTS_FILE_NAME:
+            if not snapshot.posts:
+                raise FileNotFoundError(f"No posts found for {club_name}")
+            body = dump_json_bytes(snapshot.posts)
+        else:
+            if snapshot.info_body is None:
+                raise FileNotFoundError(f"club_info.json for {club_name} not found")
+            body = snapshot.info_body
+        artifact = snapshot.artifacts[file_name] = load_memory_artifact(self.club_file_path(club_name, file_name),
+                                                                        body, snapshot.modified)
+        return artifact
+
+    def fetch_club_posts(self, club_name):
+        snapshot = self.get_club_snapshot(club_name)
+        if not snapshot.posts:
             raise FileNotFoundError(f"No posts found for {club_name}")
-        
-        posts_data = []
-        for post in os.listdir(os.path.join(self.working_path, 'data', club_name, "posts")):
-            with open(os.path.join(self.working_path, 'data', club_name, "posts", post), 'r') as file:
-                post_data = json.load(file)
             
-            posts_data.append(post_data)
-            
-        return posts_data
+        return snapshot.posts
     
     def check_if_post_exists(self, post_name) -> bool:
         return Path(post_name).exists()
@@ -115,6 +413,11 @@ class DataRetriever:
             
         return club_data
 
+    def fetch_club_manifest(self) -> list:
+        """Returns the curated club list (club_manifest.json) with each club's genre and categories."""
+        with open(self.get_club_manifest_path(), 'r') as f:
+            return json.load(f)
+
     def fetch_club_instagram_from_manifest(self) -> list[str]:
         clubs = []
         for c in self.fetch_manifest():
@@ -0,0 +1,209 @@
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from threading import Condition
+import dotenv
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from tools.logger import logger
+
+dotenv.load_dotenv()
+
+# A session is quit and replaced after this many page loads, or once its JS heap grows past the limit
+DRIVER_MAX_PAGES = int(os.getenv('DRIVER_MAX_PAGES', 200))
+DRIVER_MAX_HEAP_MB = int(os.getenv('DRIVER_MAX_HEAP_MB', 512))
+# Sessions idle for longer than this are health-checked before being leased again
+DRIVER_HEALTH_CHECK_IDLE_SECONDS = 30
+# Cookie Instagram sets for a logged-in session
+SESSION_COOKIE = 'sessionid'
+
+
+class DriverSession:
+    """A logged-in scraper with the bookkeeping the pool recycles it by."""
+
+    def __init__(self, scraper):
+        self.scraper = scraper
+        self.created_at = time.monotonic()
+        self.released_at = self.created_at
+        self.clubs_scraped = 0
+
+    @property
+    def pages_loaded(self) -> int:
+        return self.scraper.pages_loaded
+
+    def is_healthy(self) -> bool:
+        """The browser answers a script and still holds the Instagram session cookie."""
+        driver = getattr(self.scraper, '_driver', None)
+        if driver is None:
+            return False
+        try:
+            driver.execute_script("return 1")
+            return driver.get_cookie(SESSION_COOKIE) is not None
+        except Exception:  # WebDriverException, or a connection error once the browser is gone
+            return False
+
+    def heap_mb(self) -> float:
+        """Used JS heap of the current page in MB, 0 when the browser does not report it."""
+        try:
+            used = self.scraper._driver.execute_script(
+                "return window.performance && performance.memory ? performance.memory.usedJSHeapSize : 0")
+            return (used or 0) / (1024 * 1024)
+        except Exception:
+            return 0.0
+
+    def needs_recycling(self) -> bool:
+        return self.pages_loaded >= DRIVER_MAX_PAGES or self.heap_mb() >= DRIVER_MAX_HEAP_MB
+
+    def quit(self) -> None:
+        try:
+            self.scraper._driver_quit()
+        except Exception as e:
+            logger.warning(f"Error quitting a WebDriver session: {e}")
+
+
+class DriverPool:
+    """
+    A bounded pool of warmed, logged-in WebDriver sessions shared by the scraping threads.
+
+    Sessions are leased per club and returned afterwards. A session that failed, lost its
+    login or was idle for a while and fails its health check is quit and replaced; one that
+    loaded DRIVER_MAX_PAGES pages or grew past DRIVER_MAX_HEAP_MB is recycled on return.
+    """
+
+    def __init__(self, scraper_factory, max_size: int):
+        """
+        :param scraper_factory: callable returning a new InstagramScraper that is already logged in
+        :param max_size: most sessions alive at once, normally the number of scraping threads
+        """
+        self._factory = scraper_factory
+        self.max_size = max(1, max_size)
+        self._idle = deque()
+        self._size = 0
+        self._closed = False
+        self._condition = Condition()
+        self.stats = {"created": 0, "recycled": 0, "unhealthy": 0, "leases": 0, "startup_seconds": 0.0}
+
+    def warm(self, count: int = None) -> None:
+        """Starts and logs in up to `count` sessions (default max_size) in parallel, before the first lease."""
+        with self._condition:
+            count = min(self.max_size if count is None else count, self.max_size - self._size)
+            self._size += count
+        if count <= 0:
+            return
+
+        with ThreadPoolExecutor(count) as executor:
+            futures = [executor.submit(self._create) for _ in range(count)]
+        for future in futures:
+            try:
+                session = future.result()
+            except Exception as e:
+                logger.error(f"Unable to warm a WebDriver session: {e}")
+                with self._condition:
+                    self._size -= 1
+                    self._condition.notify()
+                continue
+            self.release(session)
+
+    def acquire(self) -> DriverSession:
+        """Leases a healthy session, starting a new one while the pool is below max_size."""
+        while True:
+            with self._condition:
+                while not self._idle and self._size >= self.max_size and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    raise RuntimeError("The WebDriver pool is closed.")
+                if self._idle:
+                    session = self._idle.pop()  # most recently used: least likely to have gone stale
+                else:
+                    session = None
+                    self._size += 1
+                self.stats["leases"] += 1
+
+            if session is None:
+                try:
+                    return self._create()
+                except Exception:
+                    self._discard(None)
+                    raise
+
+            if time.monotonic() - session.released_at < DRIVER_HEALTH_CHECK_IDLE_SECONDS or session.is_healthy():
+                return session
+            logger.warning("Pooled WebDriver session failed its health check; replacing it.")
+            self.stats["unhealthy"] += 1
+            self._discard(session)
+
+    def release(self, session: DriverSession, broken: bool = False) -> None:
+        """
+        Returns a leased session to the pool.
+        :param broken: the session raised while scraping; it is kept only if it still passes a health check
+        """
+        if broken and not session.is_healthy():
+            self.stats["unhealthy"] += 1
+            self._discard(session)
+            return
+        if session.needs_recycling():
+            logger.info(f"Recycling a WebDriver session after {session.pages_loaded} pages.")
+            self.stats["recycled"] += 1
+            self._discard(session)
+            return
+
+        session.released_at = time.monotonic()
+        with self._condition:
+            if self._closed:
+                self._size -= 1
+                session.quit()
+                return
+            self._idle.append(session)
+            self._condition.notify()
+
+    @contextmanager
+    def lease(self):
+        """with pool.lease() as scraper: ... — the session is marked broken if the block raises."""
+        session = self.acquire()
+        try:
+            yield session.scraper
+        except BaseException:
+            self.release(session, broken=True)
+            raise
+        else:
+            session.clubs_scraped += 1
+            self.release(session)
+
+    def close(self) -> None:
+        """Quits every idle session; sessions still leased are quit when they are returned."""
+        with self._condition:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+            self._size -= len(idle)
+            self._condition.notify_all()
+        for session in idle:
+            session.quit()
+        logger.info(f"WebDriver pool closed: {self.stats}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _create(self) -> DriverSession:
+        start = time.monotonic()
+        session = DriverSession(self._factory())
+        if not session.is_healthy():
+            session.quit()
+            raise RuntimeError("New WebDriver session is not logged in.")
+        elapsed = time.monotonic() - start
+        with self._condition:
+            self.stats["created"] += 1
+            self.stats["startup_seconds"] = round(self.stats["startup_seconds"] + elapsed, 2)
+        logger.info(f"WebDriver session started and logged in in {elapsed:.1f}s.")
+        return session
+
+    def _discard(self, session) -> None:
+        if session is not None:
+            session.quit()
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
@@ -0,0 +1,177 @@
+import heapq
+import os
+import sys
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from threading import Lock
+from zoneinfo import ZoneInfo
+import dotenv
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from tools.logger import logger
+
+dotenv.load_dotenv()
+
+# Parsed event dates usually carry no offset; they are campus-local times
+EVENTS_TIMEZONE = ZoneInfo(os.getenv('EVENTS_TIMEZONE', 'America/Los_Angeles'))
+
+
+def parse_event_time(value: str):
+    """Parses an ISO 8601 event date into an aware datetime, or None when it is not a date."""
+    try:
+        moment = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=EVENTS_TIMEZONE)
+    return moment
+
+
+def event_duration(event: dict) -> timedelta:
+    try:
+        duration = event['Duration']['estimated duration']
+        return timedelta(days=duration.get('days', 0) or 0, hours=duration.get('hours', 0) or 0)
+    except (KeyError, TypeError, AttributeError):
+        return timedelta()
+
+
+class EventSnapshot:
+    """One immutable version of the index; published whole, so a query never mixes two versions."""
+
+    __slots__ = ('starts', 'records', 'max_span')
+
+    def __init__(self, starts: tuple, records: tuple, max_span: float):
+        self.starts = starts
+        self.records = records
+        self.max_span = max_span
+
+
+class EventIndex:
+    """
+    Time-sorted index over the parsed events of every club.
+
+    Events are kept in one list ordered by start time, next to a parallel list of start
+    timestamps for bisecting. Overlap queries widen the search window by the longest event
+    duration seen, so an event that started before `start` but is still running is found.
+    Updates build a new EventSnapshot and publish it with one reference assignment, so
+    readers never take a lock and always see one consistent version.
+    """
+
+    def __init__(self, retriever):
+        self.retriever = retriever
+        self._lock = Lock()
+        # Writer-side state, only touched under the lock
+        self._by_club = {}
+        self._snapshot = EventSnapshot((), (), 0.0)
+        self.built = False
+
+    def build(self, clubs: list[str] = None) -> None:
+        """
+        Indexes every club that has data on local disk.
+        :param clubs: instagram tags to index, defaults to every club in club_manifest.json
+        """
+        manifest = self._club_metadata()
+        if clubs is None:
+            clubs = list(manifest)
+
+        by_club = {}
+        for club in clubs:
+            records = self._load_club_records(club, manifest.get(club, {}))
+            if records:
+                by_club[club] = records
+
+        with self._lock:
+            self._by_club = by_club
+            self._swap()
+            self.built = True
+        logger.info(f"Event index built with {len(self)} events from {len(by_club)} clubs.")
+
+    def update_club(self, club_name: str) -> None:
+        """Re-indexes a single club, e.g. right after its posts were parsed and bundled."""
+        self.update_clubs([club_name])
+
+    def update_clubs(self, clubs: list[str]) -> None:
+        """Re-indexes the given clubs with a single merge, e.g. once per reload rather than once per club."""
+        manifest = self._club_metadata()
+        loaded = {club: self._load_club_records(club, manifest.get(club, {})) for club in clubs}
+        with self._lock:
+            for club, records in loaded.items():
+                if records:
+                    self._by_club[club] = records
+                else:
+                    self._by_club.pop(club, None)
+            self._swap()
+
+    def query(self, start: datetime, end: datetime, category: str = None, genre: str = None,
+              limit: int = None) -> list[dict]:
+        """
+        Returns the events overlapping [start, end), ordered by start time.
+        :param category: only clubs listing this category
+        :param genre: only clubs of this genre
+        :param limit: maximum number of events returned
+        """
+        snapshot = self._snapshot
+        starts, records, max_span = snapshot.starts, snapshot.records, snapshot.max_span
+        start_ts, end_ts = start.timestamp(), end.timestamp()
+
+        results = []
+        for i in range(bisect_left(starts, start_ts - max_span), bisect_left(starts, end_ts)):
+            record = records[i]
+            if record['_end_ts'] <= start_ts and record['_start_ts'] < start_ts:
+                continue
+            if genre is not None and record['genre'] != genre:
+                continue
+            if category is not None and category not in record['categories']:
+                continue
+            results.append(record['event'])
+            if limit is not None and len(results) >= limit:
+                break
+        return results
+
+    def __len__(self) -> int:
+        return len(self._snapshot.records)
+
+    def _swap(self) -> None:
+        # Each club's records are already sorted, so this is a k-way merge rather than a full sort
+        records = tuple(heapq.merge(*self._by_club.values(), key=lambda record: record['_start_ts']))
+        max_span = max((record['_end_ts'] - record['_start_ts'] for record in records), default=0.0)
+        # A single reference assignment; a reader holding the old snapshot keeps a consistent view
+        self._snapshot = EventSnapshot(tuple(record['_start_ts'] for record in records), records, max_span)
+
+    def _club_metadata(self) -> dict:
+        try:
+            return {club['instagram']: club for club in self.retriever.fetch_club_manifest()}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Unable to read club metadata for the event index: {e}")
+            return {}
+
+    def _load_club_records(self, club_name: str, metadata: dict) -> list[dict]:
+        try:
+            events = self.retriever.fetch_club_events(club_name)
+        except FileNotFoundError:
+            return []
+
+        records = []
+        for event in events:
+            begin = parse_event_time(event.get('Date'))
+            if begin is None:
+                continue
+            finish = begin + event_duration(event)
+            records.append({
+                '_start_ts': begin.timestamp(),
+                '_end_ts': finish.timestamp(),
+                'genre': metadata.get('genre'),
+                'categories': metadata.get('categories', []),
+                'event': {
+                    'club': club_name,
+                    'club_name': metadata.get('name'),
+                    'name': event.get('Name'),
+                    'details': event.get('Details'),
+                    'start': begin.isoformat(),
+                    'end': finish.isoformat(),
+                    'genre': metadata.get('genre'),
+                    'categories': metadata.get('categories', []),
+                },
+            })
+        records.sort(key=lambda record: record['_start_ts'])
+        return records
+
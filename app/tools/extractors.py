@@ -0,0 +1,356 @@
+import html as html_lib
+from abc import ABC, abstractmethod
+from bisect import bisect_right
+import os
+import re
+import sys
+import dotenv
+from bs4 import BeautifulSoup
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from tools.logger import logger
+
+try:
+    import lxml.html
+except ImportError:  # the lxml backend is unavailable, the others still work
+    lxml = None
+
+dotenv.load_dotenv()
+
+# Backend used by the scraper: "scan", "lxml" or "soup"
+HTML_EXTRACTOR = os.getenv('HTML_EXTRACTOR', 'scan')
+
+# Exact class strings of the elements the scraper reads
+CLUB_NAME_CLASS = ("x1lliihq x1plvlek xryxfnj x1n2onr6 x1ji0vk5 x18bv5gf x193iq5w xeuugli x1fj9vlw x13faqbe "
+                   "x1vvkbs x1s928wv xhkezso x1gmr53x x1cpjm7i x1fgarty x1943h6x x1i0vuye xvs91rp x1s688f "
+                   "x5n08af x10wh9bi x1wdrske x8viiok x18hxmgj")
+POST_CAPTION_CLASS = "_ap3a _aaco _aacu _aacx _aad7 _aade"
+POST_TIME_CLASS = "_a9ze _a9zf"
+POST_IMAGE_CLASS = "x5yr21d xu96u03 x10l6tqk x13vifvy x87ps6o xh8yej3"
+
+
+def _matches(attrs, match: dict) -> bool:
+    """
+    BeautifulSoup's attribute matching: True requires the attribute, a string equals the whole
+    value or, for class/rel, one of its space-separated tokens.
+    """
+    for name, expected in match.items():
+        value = attrs.get(name)
+        if value is None:
+            return False
+        if expected is True:
+            continue
+        if value != expected and not (name in ('class', 'rel') and expected in value.split()):
+            return False
+    return True
+
+
+def _normalize(match: dict) -> dict:
+    return {('class' if name == 'class_' else name): value for name, value in match.items()}
+
+
+class PageElement(ABC):
+    """An element found by an extractor: its attributes and its text content."""
+
+    __slots__ = ('attrs',)
+
+    def __init__(self, attrs: dict):
+        self.attrs = attrs
+
+    def get(self, name: str, default=None):
+        return self.attrs.get(name, default)
+
+    def __getitem__(self, name: str):
+        return self.attrs[name]
+
+    @property
+    @abstractmethod
+    def text(self) -> str:
+        pass
+
+
+class ParsedPage(ABC):
+    """A loaded page. find/find_all take BeautifulSoup-style filters: tag name and attributes (class_=...)."""
+
+    def find(self, tag: str, **match):
+        for element in self._iter(tag, _normalize(match)):
+            return element
+        return None
+
+    def find_all(self, tag: str, **match) -> list:
+        return list(self._iter(tag, _normalize(match)))
+
+    @abstractmethod
+    def _iter(self, tag: str, match: dict):
+        pass
+
+
+class Extractor(ABC):
+    """Turns page HTML into a ParsedPage. Backends differ only in speed and memory."""
+
+    name = None
+
+    @abstractmethod
+    def load(self, page_source: str) -> ParsedPage:
+        pass
+
+
+# BeautifulSoup: builds the full tree in Python
+class _SoupElement(PageElement):
+    __slots__ = ('_tag',)
+
+    def __init__(self, tag):
+        super().__init__({name: ' '.join(value) if isinstance(value, list) else value
+                          for name, value in tag.attrs.items()})
+        self._tag = tag
+
+    @property
+    def text(self) -> str:
+        return self._tag.get_text()
+
+
+class _SoupPage(ParsedPage):
+    def __init__(self, soup):
+        self._soup = soup
+
+    def find(self, tag: str, **match):
+        element = self._soup.find(tag, attrs=_normalize(match))
+        return _SoupElement(element) if element is not None else None
+
+    def _iter(self, tag, match):
+        for element in self._soup.find_all(tag, attrs=match):
+            yield _SoupElement(element)
+
+
+class SoupExtractor(Extractor):
+    name = 'soup'
+
+    def load(self, page_source: str) -> ParsedPage:
+        return _SoupPage(BeautifulSoup(page_source, 'html.parser'))
+
+
+# lxml: builds the tree in C
+class _LxmlElement(PageElement):
+    __slots__ = ('_element',)
+
+    def __init__(self, element):
+        super().__init__(element.attrib)
+        self._element = element
+
+    @property
+    def text(self) -> str:
+        return self._element.text_content()
+
+
+class _LxmlPage(ParsedPage):
+    def __init__(self, root):
+        self._root = root
+
+    def _iter(self, tag, match):
+        for element in self._root.iter(tag):
+            if _matches(element.attrib, match):
+                yield _LxmlElement(element)
+
+
+class LxmlExtractor(Extractor):
+    name = 'lxml'
+
+    def load(self, page_source: str) -> ParsedPage:
+        if lxml is None:
+            raise RuntimeError("lxml is not installed.")
+        return _LxmlPage(lxml.html.fromstring(page_source))
+
+
+# Targeted scan: no tree at all, start tags of the requested name are matched in the raw HTML
+_ATTRIBUTE_PATTERN = re.compile(r'''([^\s"'=<>/]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'=<>`]+)))?''')
+_TAG_PATTERN = re.compile(r'<[^>]*>')
+# Openings of comments and raw-text elements, whose contents are not markup; an unclosed one runs to the end
+_IGNORED_START_PATTERN = re.compile(r'''<!--|<(script|style)(?=[\s/>])(?:[^>"']|"[^"]*"|'[^']*')*>''', re.IGNORECASE)
+_RAW_TEXT_CLOSE_PATTERNS = {name: re.compile(rf'</{name}\s*>', re.IGNORECASE) for name in ('script', 'style')}
+_COMMENT_PATTERN = re.compile(r'<!--.*?(?:-->|\Z)', re.DOTALL)
+_VOID_TAGS = frozenset(('area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source',
+                        'track', 'wbr'))
+
+
+class _ScanElement(PageElement):
+    __slots__ = ('_page', '_tag', '_end')
+
+    def __init__(self, attrs: dict, page: "_ScanPage", tag: str, end: int):
+        super().__init__(attrs)
+        self._page, self._tag, self._end = page, tag, end
+
+    @property
+    def text(self) -> str:
+        if self._tag.lower() in _VOID_TAGS:
+            return ''
+        source = self._page.source
+        # The element ends at the closing tag that brings nested same-name elements back to depth 0
+        depth, stop = 1, len(source)
+        for tag in _ScanPage.nesting_pattern(self._tag).finditer(source, self._end):
+            if self._page.is_ignored(tag.start()):
+                continue
+            if tag.group(1):
+                depth -= 1
+                if not depth:
+                    stop = tag.start()
+                    break
+            elif not tag.group(0).endswith('/>'):
+                depth += 1
+        return html_lib.unescape(_TAG_PATTERN.sub('', _COMMENT_PATTERN.sub('', source[self._end:stop])))
+
+
+class _ScanPage(ParsedPage):
+    _patterns = {}
+
+    def __init__(self, source: str):
+        self.source = source
+        self._ignored = None
+
+    @classmethod
+    def start_pattern(cls, tag: str):
+        pattern = cls._patterns.get(tag)
+        if pattern is None:
+            pattern = cls._patterns[tag] = re.compile(
+                rf'''<{tag}(?=[\s/>])((?:[^>"']|"[^"]*"|'[^']*')*)>''', re.IGNORECASE)
+        return pattern
+
+    @classmethod
+    def nesting_pattern(cls, tag: str):
+        """Start and closing tags of one name; group 1 is "/" on a closing tag."""
+        key = '/' + tag
+        pattern = cls._patterns.get(key)
+        if pattern is None:
+            pattern = cls._patterns[key] = re.compile(
+                rf'''<(/?){tag}(?=[\s/>])(?:[^>"']|"[^"]*"|'[^']*')*>''', re.IGNORECASE)
+        return pattern
+
+    def is_ignored(self, position: int) -> bool:
+        """True when position is inside a comment or inside a <script>/<style> element's contents."""
+        if self._ignored is None:
+            self._ignored = self._ignored_spans()
+        starts, ends = self._ignored
+        index = bisect_right(starts, position) - 1
+        return index >= 0 and starts[index] < position < ends[index]
+
+    def _ignored_spans(self) -> tuple:
+        """:return: (starts, ends) of the comments and <script>/<style> elements, in order"""
+        starts, ends = [], []
+        source, position = self.source, 0
+        while True:
+            opening = _IGNORED_START_PATTERN.search(source, position)
+            if opening is None:
+                return starts, ends
+            if opening.group(1):
+                close = _RAW_TEXT_CLOSE_PATTERNS[opening.group(1).lower()].search(source, opening.end())
+                position = close.end() if close else len(source)
+            else:
+                close = source.find('-->', opening.end())
+                position = close + 3 if close != -1 else len(source)
+            starts.append(opening.start())
+            ends.append(position)
+
+    def _iter(self, tag, match):
+        # Class strings never contain entities, so a page without one cannot match
+        expected_class = match.get('class')
+        if isinstance(expected_class, str) and expected_class not in self.source:
+            return
+        for start_tag in self.start_pattern(tag).finditer(self.source):
+            if self.is_ignored(start_tag.start()):
+                continue
+            attrs = {}
+            for name, double, single, bare in _ATTRIBUTE_PATTERN.findall(start_tag.group(1)):
+                attrs.setdefault(name.lower(), html_lib.unescape(double or single or bare))
+            if _matches(attrs, match):
+                yield _ScanElement(attrs, self, tag, start_tag.end())
+
+
+class ScanExtractor(Extractor):
+    name = 'scan'
+
+    def load(self, page_source: str) -> ParsedPage:
+        return _ScanPage(page_source)
+
+
+EXTRACTORS = {extractor.name: extractor for extractor in (ScanExtractor, LxmlExtractor, SoupExtractor)}
+
+
+def available_extractors() -> list[str]:
+    return [name for name in EXTRACTORS if name != 'lxml' or lxml is not None]
+
+
+def get_extractor(name: str = None) -> Extractor:
+    """:param name: backend name, defaults to HTML_EXTRACTOR; falls back to "scan" when unavailable"""
+    name = name or HTML_EXTRACTOR
+    if name not in available_extractors():
+        logger.warning(f"HTML extractor {name} is not available, using scan.")
+        name = 'scan'
+    return EXTRACTORS[name]()
+
+
+# What the scraper reads from a page, written once against the extractor interface
+def find_club_name_pfp(page: ParsedPage, club_username: str):
+    club_name = page.find("span", class_=CLUB_NAME_CLASS).text
+    club_tag = page.find("img", alt=f"{club_username}'s profile picture")
+    if not club_tag:
+        raise Exception("Profile picture not found.")
+    pfp_url = club_tag.get("src")
+    return club_name, pfp_url
+
+
+def find_club_description(page: ParsedPage):
+    meta_tag = page.find('meta', name='description')
+    if not meta_tag:
+        raise Exception("Description not found.")
+
+    description = meta_tag.get('content', '')
+
+    parts = description.split(' - ')
+
+    # Extract follower, following, and post counts
+    counts = parts[0].split(', ')
+    followers_count = counts[0].split(' ')[0].replace(',', '')
+    logger.info("obtained follower count...")
+    following_count = counts[1].split(' ')[0].replace(',', '')
+    logger.info("obtained following count...")
+    posts_count = counts[2].split(' ')[0].replace(',', '')
+    logger.info("obtained post count...")
+
+    # The rest of the string is the description
+    club_description = parts[1:]
+    logger.info("obtained description...")
+
+    return club_description, followers_count, following_count, posts_count
+
+
+def find_club_post_links(page: ParsedPage) -> list[str]:
+    """Finds all links pertaining to posts when scraping"""
+    post_links = []
+    for link in page.find_all('a', href=True):
+        href = link['href']
+        if '/p/' in href:
+            post_links.append(f"https://www.instagram.com{href}")
+    logger.info("obtained post links...")
+    return post_links
+
+
+def find_club_links(page: ParsedPage) -> list[dict]:
+    """The links in the club's bio"""
+    return [{'text': link.text.strip().replace('Link icon', '').strip(), 'url': link['href']}
+            for link in page.find_all('a', rel='me', href=True)]
+
+
+def find_post_fields(page: ParsedPage):
+    """
+    :return: (caption, date, picture) as found in the post's markup, each None when missing
+    """
+    h1_element = page.find('h1', class_=POST_CAPTION_CLASS)
+    time_element = page.find('time', class_=POST_TIME_CLASS)
+    img_element = page.find('img', class_=POST_IMAGE_CLASS)
+    return (h1_element.text if h1_element else None,
+            time_element.get('datetime') if time_element else None,
+            img_element.get('src') if img_element else None)
+
+
+def find_meta(page: ParsedPage, **match):
+    """content of the first <meta> matching, e.g. find_meta(page, property='og:image')"""
+    tag = page.find('meta', **match)
+    return tag.get('content') if tag else None
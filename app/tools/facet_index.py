@@ -0,0 +1,83 @@
+import os
+import sys
+from collections import Counter
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from tools.logger import logger
+
+
+class FacetSnapshot:
+    """One immutable version of the index; published whole, so a filter never mixes two builds."""
+
+    __slots__ = ('entries', 'postings', 'counts')
+
+    def __init__(self, entries: tuple, postings: dict, counts: dict):
+        self.entries = entries
+        self.postings = postings
+        self.counts = counts
+
+
+class FacetIndex:
+    """
+    Genre/category facets over the manifest entries.
+
+    Every facet value maps to the sorted ids (positions in the manifest) of the clubs that
+    carry it, plus the same ids as a set. A filter walks the shortest list and probes the
+    other sets, so its cost follows the smallest facet rather than the number of clubs.
+    Counts for the unfiltered manifest are precomputed.
+    """
+
+    FACETS = ('genre', 'categories')
+
+    def __init__(self):
+        self._snapshot = FacetSnapshot((), {facet: {} for facet in self.FACETS},
+                                       {facet: {} for facet in self.FACETS})
+        self.built = False
+
+    def build(self, entries: list[dict]) -> None:
+        """:param entries: manifest entries, each with a "genre" and a "categories" list"""
+        postings = {facet: {} for facet in self.FACETS}
+        for club_id, entry in enumerate(entries):
+            for facet in self.FACETS:
+                values = entry.get(facet)
+                if values is None:
+                    continue
+                for value in ([values] if isinstance(values, str) else dict.fromkeys(values)):
+                    postings[facet].setdefault(value, []).append(club_id)
+
+        counts = {facet: {value: len(ids) for value, ids in postings[facet].items()} for facet in self.FACETS}
+        # A single reference assignment: filters in flight keep the snapshot they started with
+        self._snapshot = FacetSnapshot(tuple(entries),
+                                       {facet: {value: (ids, frozenset(ids)) for value, ids in values.items()}
+                                        for facet, values in postings.items()},
+                                       counts)
+        self.built = True
+        logger.info(f"Facet index built over {len(entries)} clubs.")
+
+    def filter(self, genre: str = None, categories: list[str] = ()) -> dict:
+        """
+        Returns the clubs matching the genre and every category, with facet counts over them.
+        :return: {"total": n, "clubs": [...], "facets": {"genre": {...}, "categories": {...}}}
+        """
+        snapshot = self._snapshot
+        entries, postings, counts = snapshot.entries, snapshot.postings, snapshot.counts
+        empty = ([], frozenset())
+        id_lists = []
+        if genre:
+            id_lists.append(postings['genre'].get(genre, empty))
+        for category in categories:
+            id_lists.append(postings['categories'].get(category, empty))
+
+        if not id_lists:
+            return {"total": len(entries), "clubs": list(entries), "facets": counts}
+
+        id_lists.sort(key=lambda posting: len(posting[0]))
+        result_ids = id_lists[0][0]
+        for _, id_set in id_lists[1:]:
+            result_ids = [club_id for club_id in result_ids if club_id in id_set]
+
+        clubs = [entries[club_id] for club_id in result_ids]
+        facets = {facet: Counter() for facet in self.FACETS}
+        for club in clubs:
+            facets['genre'][club.get('genre')] += 1
+            facets['categories'].update(set(club.get('categories', [])))
+        return {"total": len(clubs), "clubs": clubs, "facets": {facet: dict(c) for facet, c in facets.items()}}
@@ -0,0 +1,41 @@
+import json
+import os
+import tempfile
+
+
+def atomic_write(path: str, data) -> None:
+    """
+    Write `data` to `path` so that readers only ever see the old or the new file.
+    The content goes to a temp file in the same directory and is renamed over `path`.
+
+    :param path: destination file
+    :param data: str or bytes
+    """
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(data)
+        os.chmod(tmp_path, 0o644)  # mkstemp creates files readable by the owner only
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def dump_json_bytes(data) -> bytes:
+    """Compact JSON serialization used for everything that is served as-is."""
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def atomic_write_json(path: str, data) -> bytes:
+    """Serialize `data` compactly, write it atomically and return the written bytes."""
+    body = dump_json_bytes(data)
+    atomic_write(path, body)
+    return body
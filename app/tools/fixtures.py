@@ -0,0 +1,104 @@
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, unquote
+import dotenv
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from tools.logger import logger
+from tools.file_utils import atomic_write
+
+dotenv.load_dotenv()
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "fixtures")
+# Set to a directory to save every page the scraper reads there, laid out for ReplayServer
+FIXTURE_RECORD_DIR = os.getenv('FIXTURE_RECORD_DIR', '')
+FIXTURE_FILE_NAME = "index.html"
+
+
+def fixture_path(url: str, root: str = FIXTURES_DIR) -> str:
+    """
+    Where the page of an instagram.com URL is saved: its path as directories, e.g.
+    https://www.instagram.com/p/C0ffee123/ -> <root>/p/C0ffee123/index.html. The query is ignored.
+    """
+    parts = [part for part in unquote(urlsplit(url).path).split('/') if part not in ('', '.', '..')]
+    return os.path.join(root, *parts, FIXTURE_FILE_NAME)
+
+
+def record_page(url: str, html: str, root: str = None) -> None:
+    """Saves a page the scraper read, when FIXTURE_RECORD_DIR (or root) is set; recording never fails a scrape."""
+    root = root or FIXTURE_RECORD_DIR
+    if not root or not html:
+        return
+    path = fixture_path(url, root)
+    try:
+        atomic_write(path, html)
+    except OSError as e:
+        logger.warning(f"Unable to record {url} to {path}: {e}")
+
+
+class _FixtureHandler(BaseHTTPRequestHandler):
+    server_version = "FixtureReplay"
+
+    def do_GET(self):
+        path = fixture_path(self.path, self.server.root)
+        if not os.path.isfile(path):
+            self.server.stats["missing"] += 1
+            self.send_error(404, "No fixture recorded for this page")
+            return
+        with open(path, 'rb') as file:
+            body = file.read()
+        self.server.stats["served"] += 1
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ReplayServer:
+    """
+    Serves recorded pages over local HTTP so the scraper can run against them offline: point
+    an HttpFetcher (or INSTAGRAM_BASE_URL) at base_url. Pages that were never recorded answer 404.
+
+        with ReplayServer("fixtures") as server:
+            fetcher = HttpFetcher(base_url=server.base_url)
+    """
+
+    def __init__(self, root: str = FIXTURES_DIR, host: str = "127.0.0.1", port: int = 0):
+        """:param port: 0 picks a free one"""
+        self._server = ThreadingHTTPServer((host, port), _FixtureHandler)
+        self._server.daemon_threads = True
+        self._server.root = root
+        self._server.stats = {"served": 0, "missing": 0}
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def stats(self) -> dict:
+        return dict(self._server.stats)
+
+    def start(self) -> "ReplayServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fixture-replay", daemon=True)
+        self._thread.start()
+        logger.info(f"Replaying fixtures from {self._server.root} at {self.base_url}")
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
@@ -7,7 +7,6 @@ import time
 import sys
 import dotenv
 import base64
-from bs4 import BeautifulSoup
 from selenium import webdriver
 from selenium.common.exceptions import WebDriverException, NoSuchElementException, TimeoutException
 from selenium.webdriver.chrome.options import Options
@@ -24,15 +23,88 @@ from botocore.exceptions import NoCredentialsError, PartialCredentialsError, Cli
 import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from tools.logger import logger
+from tools.driver_pool import DriverPool
+from tools.step_timer import StepTimer
+from tools.rate_limiter import AdaptiveRateLimiter
+from tools.scrape_journal import ScrapeJournal
+from tools.page_fetcher import HttpFetcher, FetchError, HTTP_FETCH_ENABLED, parse_post_page, parse_profile_page
+from tools.file_utils import atomic_write_json
+from tools.fixtures import record_page
+from tools.extractors import (get_extractor, find_club_name_pfp, find_club_description, find_club_post_links,
+                              find_post_fields)
+from tools.scrape_queue import ClubQueue, WorkerStats, load_scrape_stats, save_scrape_stats
 #import chromedriver_binary  # This automatically sets up ChromeDriver
 
+# Longest wait for a page to show its content or a sign that it will not (error page, no caption)
+PAGE_READY_TIMEOUT = int(os.getenv('PAGE_READY_TIMEOUT', 10))
+PAGE_READY_POLL_SECONDS = 0.1
+# How long a page may show only part of its content before the rest is taken as absent
+PAGE_SETTLE_SECONDS = 1.0
+# First retry delay of a failed club, doubled on every further attempt
+RETRY_BASE_DELAY = float(os.getenv('SCRAPE_RETRY_BASE_DELAY', 1))
+# Scraping threads of the reload job; one browser by default, the shared rate limiter paces any more
+SCRAPE_THREADS = int(os.getenv('SCRAPE_THREADS', 1))
+
+# One round trip reporting everything the profile steps would otherwise wait for one by one
+PROFILE_STATE_SCRIPT = r"""
+const has = (xpath) => document.evaluate(`boolean(${xpath})`, document, null, XPathResult.BOOLEAN_TYPE, null).booleanValue;
+return {
+    login: /^\/(accounts\/login|challenge)/.test(location.pathname),
+    missing: has("//span[contains(text(), \"Sorry, this page isn't available.\")]"),
+    header: !!document.querySelector('header'),
+    posts: document.querySelectorAll("a[href*='/p/']").length,
+    more: has("//span[contains(@class, 'x1lliihq') and text()='more']"),
+    links: document.querySelectorAll("a[rel='me nofollow noopener noreferrer'][target='_blank']").length,
+    links_button: !!document.querySelector('button._acan._acao._acas._aj1-._ap30'),
+};
+"""
+POST_STATE_SCRIPT = r"""
+const has = (xpath) => document.evaluate(`boolean(${xpath})`, document, null, XPathResult.BOOLEAN_TYPE, null).booleanValue;
+return {
+    login: /^\/(accounts\/login|challenge)/.test(location.pathname),
+    missing: has("//span[contains(text(), \"Sorry, this page isn't available.\")]"),
+    caption: has("//h1[contains(@class, '_ap3a') and contains(@class, '_aaco') and contains(@class, '_aacu')]"),
+    time: !!document.querySelector('time._a9ze._a9zf'),
+};
+"""
+
+# Where club_info.json, posts/ and known_posts.json of every club are stored
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "data")
+
+# Per-club index of the shortcodes of posts already stored, next to club_info.json
+KNOWN_POSTS_FILE_NAME = "known_posts.json"
+POST_SHORTCODE_PATTERN = re.compile(r"/(?:p|reel)/([^/?#]+)")
+
+
+def post_shortcode(post_url: str):
+    """Extracts the shortcode (the /p/<shortcode>/ part) of a post URL, or None when there is none."""
+    match = POST_SHORTCODE_PATTERN.search(post_url or "")
+    return match.group(1) if match else None
+
 
 
 class InstagramScraper:
-    def __init__(self, username, password):
+    def __init__(self, username, password, http_fetcher: HttpFetcher = None, timer: StepTimer = None,
+                 rate_limiter: AdaptiveRateLimiter = None, data_dir: str = DATA_DIR, browser: bool = True):
+        """
+        :param data_dir: where club and post data is saved
+        :param browser: False reads pages over http_fetcher only (e.g. from a ReplayServer); pages
+            it cannot read fail as a browser error would
+        """
         self._username = username
         self._password = password
         self._current_page = "none"
+        self.pages_loaded = 0
+        # When the page load not yet reported to the rate limiter started, None once reported
+        self._page_started = None
+        # Tried before the browser for every page; None scrapes with Selenium only
+        self._http = http_fetcher
+        self._extractor = get_extractor()
+        # Per-step durations, shared by every session of a run
+        self.timer = timer or StepTimer()
+        # Paces page loads across every session of a run; None loads pages unpaced
+        self._rate_limiter = rate_limiter
+        self.data_dir = data_dir
         # self.dbx = dropbox.Dropbox(os.getenv("DROPBOX_API_KEY"))
         # self.s3 = boto3.client(
         #     's3',
@@ -42,6 +114,11 @@ class InstagramScraper:
         # )
         # self.bucket_name = os.getenv('S3_BUCKET_NAME')
 
+        self._driver = None
+        self._wait = None
+        if not browser:
+            return
+
         options = Options()
         self._add_options(options)
 
@@ -61,6 +138,95 @@ class InstagramScraper:
         
         return driver
     
+    def _fetch_over_http(self, url: str, parse):
+        """
+        Reads a page without the browser.
+        :param parse: turns the HTML into the result, None when the page lacks the data
+        :return: the parsed result, or None when the Selenium path is needed
+        """
+        if self._http is None or not self._http.available:
+            return None
+        kind = "post" if "/p/" in url else "profile"
+        try:
+            with self.timer.step(f"http.{kind}"):
+                html = self._http.fetch(url)
+                result = parse(html)
+        except FetchError as e:
+            logger.info(f"HTTP fetch unavailable, using the browser: {e}")
+            self._http.report_page(False)
+            return None
+        self._http.report_page(result is not None)
+        if result is None:
+            logger.info(f"{url} is not server-rendered, using the browser.")
+        else:
+            record_page(url, html)
+        return result
+
+    def _load_page(self, url: str, step: str = "page") -> None:
+        """Navigates the driver, counting page loads so a pooled session can be recycled."""
+        if self._driver is None:
+            raise WebDriverException(f"No browser to load {url}")
+        self.pages_loaded += 1
+        if self._rate_limiter is not None:
+            with self.timer.step("rate_limit"):
+                self._rate_limiter.acquire()
+        self._page_started = time.monotonic()
+        with self.timer.step(f"{step}.navigate"):
+            self._driver.get(url)
+
+    def _wait_for_page(self, script: str, is_complete, is_partial, step: str) -> dict:
+        """
+        Polls the page state until it is complete, or has stayed partial for PAGE_SETTLE_SECONDS
+        (whatever is missing by then is absent rather than slow), or PAGE_READY_TIMEOUT passes.
+        :param script: JS returning a dict describing what the page shows
+        :return: the last state read
+        """
+        with self.timer.step(f"{step}.ready"):
+            deadline = time.monotonic() + PAGE_READY_TIMEOUT
+            partial_since = None
+            while True:
+                state = self._driver.execute_script(script) or {}
+                now = time.monotonic()
+                if state.get('login'):
+                    self._report_page("blocked")
+                    raise WebDriverException(f"Redirected to the login wall ({self._driver.current_url})")
+                if is_complete(state):
+                    self._report_page()
+                    return state
+                if now >= deadline:
+                    self._report_page("slow")
+                    return state
+                if is_partial(state):
+                    partial_since = partial_since or now
+                    if now - partial_since >= PAGE_SETTLE_SECONDS:
+                        self._report_page()
+                        return state
+                else:
+                    partial_since = None
+                time.sleep(PAGE_READY_POLL_SECONDS)
+
+    def _report_page(self, trouble: str = None) -> None:
+        """Tells the rate limiter how the last page load went, once per load."""
+        started, self._page_started = self._page_started, None
+        if self._rate_limiter is None or started is None:
+            return
+        if trouble is None:
+            self._rate_limiter.report_success(time.monotonic() - started)
+        else:
+            self._rate_limiter.report_trouble(trouble)
+
+    def _wait_for_profile(self) -> dict:
+        # Done once posts or the error page show; a header alone settles into a profile without posts
+        return self._wait_for_page(PROFILE_STATE_SCRIPT,
+                                   lambda state: state.get('posts') or state.get('missing'),
+                                   lambda state: state.get('header'), "profile")
+
+    def _wait_for_post(self) -> dict:
+        # Done once the caption or the error page show; a time alone settles into a post without caption
+        return self._wait_for_page(POST_STATE_SCRIPT,
+                                   lambda state: state.get('caption') or state.get('missing'),
+                                   lambda state: state.get('time'), "post")
+
     def __enter__(self):
         return self
 
@@ -103,7 +269,13 @@ class InstagramScraper:
                 password_field.send_keys(self._password)
                 password_field.send_keys("\n")  # Simulate pressing Enter
                 logger.info("Login credentials sent.")
-                time.sleep(5)
+                # Logged in once the session cookie is set; an error message ends the wait early
+                with self.timer.step("login.wait"):
+                    try:
+                        WebDriverWait(self._driver, PAGE_READY_TIMEOUT, poll_frequency=PAGE_READY_POLL_SECONDS).until(
+                            lambda driver: driver.get_cookie('sessionid') or driver.find_elements(By.CLASS_NAME, "_ab2z"))
+                    except TimeoutException:
+                        logger.warning("No session cookie or login error after sending credentials.")
 
                 # Check if login was successful or failed
                 error_message = self._check_login_error()
@@ -113,6 +285,11 @@ class InstagramScraper:
 
                 self._get_cookies()
 
+            # Let the HTTP fast path make requests as the logged-in account, from the same browser
+            if self._http is not None and not self._http.has_session():
+                self._http.set_user_agent(self._driver.execute_script("return navigator.userAgent"))
+                self._http.load_cookies(self._driver.get_cookies())
+
         except WebDriverException as e:
             logger.error(f"Error during login: {e}", exc_info=True)
             self._driver_quit()
@@ -146,22 +323,31 @@ class InstagramScraper:
         :param club_username: the instagram tag of the club
         :return club_info: a dictionary containing the club's information
         """
+        profile_url = f"https://www.instagram.com/{club_username}/"
+        club_info = self._fetch_over_http(profile_url, lambda html: parse_profile_page(html, club_username))
+        if club_info is not None:
+            return club_info,
+
         try:
 
-            profile_url = f"https://www.instagram.com/{club_username}/"
-            self._driver.get(profile_url)
-            # if not self.check_instagram_handle(club_username):
-            #     raise Exception("Invalid Instagram handle.")
+            self._load_page(profile_url, "profile")
+            state = self._wait_for_profile()
+            if state.get('missing'):
+                logger.warning(f"{club_username}: Sorry, this page isn't available.")
             
-            self._handle_instagram_more_button()
-            club_links = self._handle_instagram_links_button()
+            with self.timer.step("profile.more_button"):
+                self._handle_instagram_more_button(state)
+            with self.timer.step("profile.links_button"):
+                club_links = self._handle_instagram_links_button(state)
 
-            page_source = self._driver.page_source
-            profile_soup = BeautifulSoup(page_source, 'html.parser')
+            with self.timer.step("profile.parse"):
+                page_source = self._driver.page_source
+                record_page(profile_url, page_source)
+                profile_page = self._extractor.load(page_source)
 
-            club_name, pfp_url = self._find_club_name_pfp(profile_soup, club_username)
-            club_description, followers_count, following_count, posts_count = self._find_club_description(profile_soup)
-            post_links = self._find_club_post_links(profile_soup)
+                club_name, pfp_url = find_club_name_pfp(profile_page, club_username)
+                club_description, followers_count, following_count, posts_count = find_club_description(profile_page)
+                post_links = find_club_post_links(profile_page)
 
 
             return {"Instagram Handle": club_username,
@@ -176,81 +362,129 @@ class InstagramScraper:
 
         except WebDriverException as e:
             logger.error(f"Error fetching club info: {e}")
+            self._report_page("error")
             self._driver_quit()
 
     
     def get_post_info(self, post_url: str) -> tuple:
         """Main method to scrape post information."""
+        post_info = self._fetch_over_http(post_url, parse_post_page)
+        if post_info is not None:
+            return post_info
+
         description = ""
         date = ""
+        img_src = "http://www.w3.org/2000/svg"
 
         try:
-            self._driver.get(post_url)
-            self._wait.until(EC.presence_of_element_located((By.XPATH,
-                                                             "//h1[contains(@class, '_ap3a') and contains(@class, '_aaco') and contains(@class, '_aacu')]")))
-
-            post_source = self._driver.page_source
-            post_soup = BeautifulSoup(post_source, 'html.parser')
-
-            # Looks for post description
-            h1_element = post_soup.find('h1', class_="_ap3a _aaco _aacu _aacx _aad7 _aade")
-            description = h1_element.text if h1_element else ""
-
-
-            # looks for post time
-            post_time = post_soup.find('time', class_="_a9ze _a9zf")
-            date = post_time['datetime']
-            img_src = 0
-            
-            # look for post pic
-            img_tag = post_soup.find('img', class_="x5yr21d xu96u03 x10l6tqk x13vifvy x87ps6o xh8yej3")
-            try:
-                img_src = img_tag.get('src', 'http://www.w3.org/2000/svg') if img_tag else 'http://www.w3.org/2000/svg'
-            except Exception as e:
+            self._load_page(post_url, "post")
+            self._wait_for_post()
+
+            with self.timer.step("post.parse"):
+                post_source = self._driver.page_source
+                record_page(post_url, post_source)
+                post_page = self._extractor.load(post_source)
+
+                # Looks for post description, post time and post pic
+                caption, post_time, post_pic = find_post_fields(post_page)
+            description = caption or ""
+            date = post_time or ""
+            if post_pic:
+                img_src = post_pic
+            else:
                 logger.info("could not find img_src")
-                img_src = "http://www.w3.org/2000/svg"
             
         
         except WebDriverException as e:
             logger.error(f"Error fetching post info: {str(e)}")
+            self._report_page("error")
             
 
         return description, date, img_src
 
     def save_post_info(self, club_username: str):
-        """Save the description and date of each post into a file"""
+        """
+        Save the description and date of each new post into a file. Posts whose shortcode is
+        already in the club's known-posts index are skipped without loading their page.
+        """
 
         post_links = self._get_club_post_links(club_username)
-        
-        
-            
-            
-        
-        club_path = os.path.join(os.path.dirname(__file__), "..", "..", "data", club_username, "posts")
-        if not os.path.exists(club_path):
-            os.makedirs(club_path)
+        known_posts = self._load_known_posts(club_username)
+        self._store_posts(club_username, post_links, known_posts, self._fetch_new_posts(post_links, known_posts))
 
+    def collect_club_data(self, club_username: str) -> dict:
+        """
+        Scrapes a club and its new posts without writing anything, for a worker that hands the
+        result to whoever stores it (see store_club_result). Known posts are read, not updated.
+        :return: {"club_info": club info dict, "posts": [(shortcode, post data), ...]}
+        """
+        club_info = self.get_club_info(club_username)[0]
+        post_links = club_info["Recent Posts"]
+        posts = list(self._fetch_new_posts(post_links, self._load_known_posts(club_username)))
+        return {"club_info": club_info, "posts": posts}
+
+    def store_club_result(self, result: dict) -> None:
+        """Saves what collect_club_data returned, as store_club_data would have."""
+        club_info = result["club_info"]
+        club_username = club_info["Instagram Handle"]
+        self.save_club_info((club_info,))
+        self._store_posts(club_username, club_info["Recent Posts"], self._load_known_posts(club_username),
+                          result["posts"])
+
+    def _fetch_new_posts(self, post_links: list[str], known_posts: dict):
+        """Yields (shortcode, post data) of each post that is not in known_posts and has a date."""
         for post in post_links:
+            shortcode = post_shortcode(post)
+            if shortcode is not None and shortcode in known_posts:
+                continue
             try:
                 description, date, post_pic = self.get_post_info(post)
-                post_data = {"Description": description, "Date": date, "Picture": post_pic}
-                post_path = os.path.join(club_path, f"{date}.json")
-                
-                if os.path.exists(post_path):
-                    logger.info(f"This post path is already created: {post_path}")
-                    continue
-                else:
-                    logger.info(f"creating post at: {post_path}")
-                    with open(post_path, "w") as file:
-                        json.dump(post_data, file)
             except:
                 logger.info("scrapper could not properly scrape. execution sequence will skip post.")
                 continue
+            if not date:
+                logger.info(f"No date found for {post}; it will be retried next run.")
+                continue
+            yield shortcode, {"Description": description, "Date": date, "Picture": post_pic}
+
+    def _store_posts(self, club_username: str, post_links: list[str], known_posts: dict, posts) -> None:
+        """
+        Writes each post as it comes and records it in the known-posts index, saved even when
+        the posts stop part way.
+        :param posts: (shortcode, post data) pairs
+        """
+        club_path = os.path.join(self.data_dir, club_username, "posts")
+        if not os.path.exists(club_path):
+            os.makedirs(club_path)
+
+        skipped = sum(1 for post in post_links if post_shortcode(post) in known_posts)
+        new_posts = 0
+        try:
+            for shortcode, post_data in posts:
+                post_path = os.path.join(club_path, f"{post_data['Date']}.json")
+                try:
+                    if os.path.exists(post_path):
+                        logger.info(f"This post path is already created: {post_path}")
+                    else:
+                        logger.info(f"creating post at: {post_path}")
+                        with open(post_path, "w") as file:
+                            json.dump(post_data, file)
+                        new_posts += 1
+                except OSError as e:
+                    logger.error(f"Unable to save post {post_path}: {e}")
+                    continue
+                if shortcode is not None:
+                    known_posts[shortcode] = post_data["Date"]
+        finally:
+            # Only posts still on the profile can come up again, so older shortcodes are dropped
+            current = [post_shortcode(post) for post in post_links]
+            self._save_known_posts(club_username, {code: known_posts[code] for code in current if code in known_posts})
+        logger.info(f"{club_username}: {new_posts} new posts, {skipped} already known posts skipped.")
 
     def save_club_info(self, club_info: json):
         """Save the club information into a file"""
 
-        club_info_path = os.path.join(os.path.dirname(__file__), "..", "..", "data", f"{club_info[0]['Instagram Handle']}")
+        club_info_path = os.path.join(self.data_dir, f"{club_info[0]['Instagram Handle']}")
 
         if not os.path.exists(club_info_path):
             os.makedirs(club_info_path)
@@ -262,45 +496,36 @@ class InstagramScraper:
 
     def check_instagram_handle(self, club_username) -> bool:
         try:
-            # Navigate to the Instagram page
-            self._driver.get(f"https://www.instagram.com/{club_username}/")
-
-            # Wait for the error message or the page content
-            try:
-                # Wait specifically for the error span to appear
-                WebDriverWait(self._driver, 10).until(
-                    EC.visibility_of_element_located(
-                        (By.XPATH, "//span[contains(text(), \"Sorry, this page isn't available.\")]")
-                    )
-                )
-                return False  # Error span found, handle is invalid
-            except TimeoutException:
-                # If the span isn't found within the timeout, assume the page is valid
-                return True
+            # Navigate to the Instagram page and wait for either its content or the error message
+            self._load_page(f"https://www.instagram.com/{club_username}/", "profile")
+            return not self._wait_for_profile().get('missing')
 
         except WebDriverException as e:
             # Handle other driver-related errors
             logger.info(f"WebDriver error: {e}")
+            self._report_page("error")
             return False
-    def _handle_instagram_links_button(self):
-        #TODO: fix this shitter
-        try:
-            # Wait for the button to be present, but allow for a possible timeout
-            # check if there is only one link:
-            try:
-                link_element = self._wait.until(EC.presence_of_element_located(
-                    (By.XPATH, "//a[@rel='me nofollow noopener noreferrer' and @target='_blank']")))
-                
-                return [{'text': link_element.get_attribute('text'), 'url':link_element.get_attribute('href')}]
-            except TimeoutException:
-                pass
-            self._wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, 'button._acan._acao._acas._aj1-._ap30')))
 
-            # Find the button and click it if it's found
+    def _handle_instagram_links_button(self, state: dict):
+        """
+        Reads the bio links: a single link is on the page, several sit behind a button.
+        :param state: the profile state read once the page was ready; nothing is waited for when it shows no links
+        """
+        try:
+            if state.get('links') and not state.get('links_button'):
+                link_element = self._driver.find_element(
+                    By.XPATH, "//a[@rel='me nofollow noopener noreferrer' and @target='_blank']")
+                return [{'text': link_element.get_attribute('text'), 'url': link_element.get_attribute('href')}]
+            if not state.get('links_button'):
+                logger.info("No links on this profile.")
+                return None
+
+            # Find the button and click it
             button = self._driver.find_element(By.CSS_SELECTOR, 'button._acan._acao._acas._aj1-._ap30')
             button.click()
             logger.info("Links button clicked successfully.")
 
+            # The dialog is known to be opening, so waiting for it is not wasted
             self._wait.until(EC.presence_of_element_located(
                 (By.XPATH, "//a[@rel='me nofollow noopener noreferrer' and @target='_blank']")))
             links = self._driver.find_elements(By.XPATH,
@@ -322,75 +547,25 @@ class InstagramScraper:
 
         except TimeoutException:
             # This will catch the case where the element is not found within the timeout
-            logger.warning("Links button not found within the timeout.")
+            logger.warning("Links dialog did not open within the timeout.")
 
         except Exception as e:
             # Catch any other unexpected exceptions
             logger.error(f"An error occurred while trying to interact with the links button: {e}")
 
-    def _handle_instagram_more_button(self):
+    def _handle_instagram_more_button(self, state: dict):
+        """:param state: the profile state read once the page was ready"""
+        if not state.get('more'):
+            logger.info("More... button not found.")
+            return
         try:
-            self._wait.until(EC.presence_of_all_elements_located((By.XPATH, "//a[contains(@href, '/p/')]")))
-            button_element = self._wait.until(EC.presence_of_element_located(
-                (By.XPATH, "//span[contains(@class, 'x1lliihq') and text()='more']")))
+            button_element = self._driver.find_element(
+                By.XPATH, "//span[contains(@class, 'x1lliihq') and text()='more']")
 
             button_element.click()
             logger.info("Button for more info clicked!")
-        except (NoSuchElementException, TimeoutException):
-            logger.info("More... button not found / timeout error.")
-
-    def _find_club_name_pfp(self, profile_soup: BeautifulSoup, club_username: str):
-        club_name = profile_soup.find("span", class_="x1lliihq x1plvlek xryxfnj x1n2onr6 x1ji0vk5 x18bv5gf "
-                                                     "x193iq5w xeuugli x1fj9vlw x13faqbe x1vvkbs x1s928wv xhkezso "
-                                                     "x1gmr53x x1cpjm7i x1fgarty x1943h6x x1i0vuye xvs91rp "
-                                                     "x1s688f x5n08af x10wh9bi x1wdrske x8viiok x18hxmgj").text
-        club_tag = profile_soup.find("img", alt=f"{club_username}'s profile picture")
-        if not club_tag:
-            raise Exception("Profile picture not found.")
-        pfp_url = club_tag.get("src")
-        return club_name, pfp_url
-
-    def _find_club_description(self, profile_soup: BeautifulSoup):
-        meta_tag = profile_soup.find('meta', {'name': 'description'})
-        if not meta_tag:
-            raise Exception("Description not found.")
-
-        description = meta_tag.get('content', '')
-
-        parts = description.split(' - ')
-
-        # Extract follower, following, and post counts
-
-        counts = parts[0].split(', ')
-        followers_count = counts[0].split(' ')[0].replace(',', '')
-        logger.info("obtained follower count...")
-        following_count = counts[1].split(' ')[0].replace(',', '')
-        logger.info("obtained following count...")
-        posts_count = counts[2].split(' ')[0].replace(',', '')
-        logger.info("obtained post count...")
-
-        # The rest of the string is the description
-        club_description = parts[1:]
-        logger.info("obtained description...")
-
-        return club_description, followers_count, following_count, posts_count
-
-    def _find_club_post_links(self, profile_soup: BeautifulSoup):
-        """
-        Fins all links pertaining to posts when scraping
-        :param profile_soup:
-        :return:
-        """
-        links = profile_soup.find_all('a', href=True)
-
-        post_links = []
-        for link in links:
-            href = link['href']
-            if '/p/' in href:
-                post_url = f"https://www.instagram.com{href}"
-                post_links.append(post_url)
-        logger.info("obtained post links...")
-        return post_links
+        except (NoSuchElementException, WebDriverException):
+            logger.info("More... button could not be clicked.")
 
     def _is_club(self, text):
         """Check if the text refers to a club or organization."""
@@ -414,12 +589,32 @@ class InstagramScraper:
         :param club_username:
         :return:
         """
-        club_info_path = os.path.join(os.path.dirname(__file__), "..", "..", "data", club_username, "club_info.json")
+        club_info_path = os.path.join(self.data_dir, club_username, "club_info.json")
         with open(club_info_path, "r") as file:
             clubs_info = json.load(file)
 
         return clubs_info["Recent Posts"]
 
+    def _known_posts_path(self, club_username: str) -> str:
+        return os.path.join(self.data_dir, club_username, KNOWN_POSTS_FILE_NAME)
+
+    def _load_known_posts(self, club_username: str) -> dict:
+        """:return: {shortcode: post date} of every post already stored for the club"""
+        try:
+            with open(self._known_posts_path(club_username), "r") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Unable to read known posts of {club_username}, fetching every post: {e}")
+            return {}
+
+    def _save_known_posts(self, club_username: str, known_posts: dict) -> None:
+        try:
+            atomic_write_json(self._known_posts_path(club_username), known_posts)
+        except OSError as e:
+            logger.error(f"Unable to save known posts of {club_username}: {e}")
+
     def _driver_quit(self):
         if hasattr(self, '_driver') and self._driver:
             self._driver.quit()
@@ -543,86 +738,171 @@ class InstagramScraper:
 
 
 
-def chunk_list(lst, n):
-    """Divide a list into n chunks, prioritizing evenly-sized distributions."""
-    avg = len(lst) // n
-    remainder = len(lst) % n
-    chunks = []
-    start = 0
-
-    for i in range(n):
-        extra = 1 if i < remainder else 0  # Distribute the remainder
-        end = start + avg + extra
-        chunks.append(lst[start:end])
-        start = end
-
-    return chunks
+def create_logged_in_scraper(http_fetcher: HttpFetcher = None, timer: StepTimer = None,
+                             rate_limiter: AdaptiveRateLimiter = None) -> InstagramScraper:
+    """Starts a WebDriver and logs it into Instagram; the factory of the scraping DriverPool."""
+    scraper = InstagramScraper(os.getenv("INSTAGRAM_USERNAME"), os.getenv("INSTAGRAM_PASSWORD"), http_fetcher, timer,
+                               rate_limiter)
+    logger.info("Init scraper")
+    scraper.login()
+    logger.info("Logged in")
+    return scraper
 
-def scrape_with_retries(scraper, username, max_retries=3, delay=5):
+def run_with_retries(pool: DriverPool, username, scrape, max_retries=3, delay=RETRY_BASE_DELAY) -> tuple:
+    """
+    Runs scrape(scraper) for one club on a leased session. A failed attempt returns its session
+    to the pool as broken, so the next attempt runs on a healthy (possibly fresh) one after a
+    short backoff that doubles per attempt.
+    :return: (True, what scrape returned), or (False, None) once every attempt failed
+    """
     for attempt in range(max_retries):
         try:
-            scraper.store_club_data(username)
+            with pool.lease() as scraper:
+                result = scrape(scraper)
             logger.info(f"Scraping of {username} complete.")
-            return scraper
+            return True, result
         except Exception as e:
             logger.warning(f"Attempt {attempt + 1} failed for {username}: {e}")
             if attempt < max_retries - 1:
-                time.sleep(delay)
-            else:
-                logger.error(f"Restarting WebDriver after repeated failures for {username}.")
-                scraper._driver_quit()
-                scraper = InstagramScraper(os.getenv("INSTAGRAM_USERNAME"), os.getenv("INSTAGRAM_PASSWORD"))
-                scraper.login()
-                return scraper
+                time.sleep(delay * 2 ** attempt * random.uniform(0.5, 1.5))
+    logger.error(f"Giving up on {username} after {max_retries} attempts.")
+    return False, None
+
+def scrape_with_retries(pool: DriverPool, username, max_retries=3, delay=RETRY_BASE_DELAY) -> bool:
+    """
+    Scrapes and stores one club, see run_with_retries.
+    :return: True only if store_club_data stored the club; a club it rejects is not retried
+    """
+    ok, stored = run_with_retries(pool, username, lambda scraper: scraper.store_club_data(username), max_retries, delay)
+    return ok and stored is True
+
+def create_scraper_pool(max_size: int, timer: StepTimer = None, rate_limiter: AdaptiveRateLimiter = None) -> DriverPool:
+    """
+    A DriverPool whose sessions share one HTTP fetcher (unless HTTP_FETCH_ENABLED is false),
+    one step timer and one rate limiter.
+    """
+    http_fetcher = HttpFetcher(rate_limiter=rate_limiter) if HTTP_FETCH_ENABLED else None
+    return DriverPool(lambda: create_logged_in_scraper(http_fetcher, timer, rate_limiter), max_size)
 
-def scrape_sequence(username_list: list[str]) -> None:
+def scrape_sequence(username_list: list[str], pool: DriverPool = None) -> None:
     """
     Scrape the Instagram page of a club and store the data.
     Args:
         username_list (list[str]): List of Instagram usernames of clubs.
+        pool (DriverPool): sessions to scrape with; a single-session pool is used when omitted.
     """
-    scraper = None
+    own_pool = pool is None
+    if own_pool:
+        pool = create_scraper_pool(1)
     try:
-        
-        scraper = InstagramScraper(os.getenv("INSTAGRAM_USERNAME"), os.getenv("INSTAGRAM_PASSWORD"))
-        logger.info("Init scraper")
-        scraper.login()
-        logger.info("Logged in")
         for username in username_list:
             logger.info(f"Scraping {username}...")
-            scraper = scrape_with_retries(scraper, username)
-            logger.info(f"Scraping of {username} complete.")
+            scrape_with_retries(pool, username)
 
     except Exception as e:
         logger.error(f"An error occurred: {e}")
     finally:
-        if scraper:
-            scraper._driver_quit()
+        if own_pool:
+            pool.close()
     
 
     
-def multi_threaded_scrape(clubs: list[str], max_threads: int) -> None:
+def scrape_worker(queue: ClubQueue, pool: DriverPool, stats: WorkerStats, journal: ScrapeJournal = None) -> None:
+    """Pulls clubs off the shared queue until it is drained, checkpointing each one in the journal."""
+    while True:
+        username = queue.pop()
+        if username is None:
+            break
+        logger.info(f"[{stats.name}] Scraping {username} ({len(queue)} left in queue)...")
+        if journal is not None:
+            journal.mark_running(username)
+        start = time.monotonic()
+        ok = scrape_with_retries(pool, username)
+        elapsed = time.monotonic() - start
+        if journal is not None:
+            if ok:
+                journal.mark_done(username)
+            else:
+                journal.mark_failed(username, "retries exhausted")
+        queue.record(username, elapsed, ok)
+        stats.record(elapsed, ok)
+    stats.finished_at = time.monotonic()
+
+def multi_threaded_scrape(clubs: list[str], max_threads: int = SCRAPE_THREADS, pool: DriverPool = None,
+                          timer: StepTimer = None, rate_limiter: AdaptiveRateLimiter = None,
+                          journal: ScrapeJournal = None) -> dict:
     """
-    Runs scraper on multiple threads, dividing clubs among threads.
+    Runs scraper on multiple threads pulling clubs from one shared priority queue, so a
+    thread stuck on a slow profile does not hold back clubs the other threads could take.
+    The threads share one pool of logged-in sessions, warmed up front.
 
     Args:
         clubs (list[str]): Instagram usernames of clubs.
         max_threads (int): Number of threads to use.
+        pool (DriverPool): sessions to reuse across runs; a pool of max_threads sessions is used when omitted.
+        timer (StepTimer): collects per-step durations; pass the one the given pool's sessions were created with.
+        rate_limiter (AdaptiveRateLimiter): paces every thread's requests; likewise shared with the given pool.
+        journal (ScrapeJournal): checkpoints per club, so an interrupted run resumes and recently
+            scraped clubs are skipped; the default journal next to jobs.sqlite when omitted.
+    Returns:
+        dict: run report with the throughput of each worker and the time spent per scraping step.
     """
-    club_chunks = chunk_list(clubs, max_threads)  # Divide the clubs list into chunks
-    logger.info(f"Divided {len(clubs)} clubs into {len(club_chunks)} chunks for {max_threads} threads.")
-
-    with ThreadPoolExecutor(max_threads) as executor:
-        futures = []
-        for chunk in club_chunks:
-            futures.append(executor.submit(scrape_sequence, chunk))
-
-        # Wait for all threads to complete
-        for future in futures:
-            try:
-                future.result()  # This raises any exception that occurred during task execution
-            except Exception as e:
-                logger.error(f"An error occurred in a thread: {e}")
+    started = time.monotonic()
+    timer = timer or StepTimer()
+    rate_limiter = rate_limiter or AdaptiveRateLimiter()
+    own_journal = journal is None
+    if own_journal:
+        journal = ScrapeJournal()
+    run_id, remaining = journal.begin_run(clubs)
+    queue = ClubQueue(remaining, load_scrape_stats())
+    if not queue.total:
+        run = journal.finish_run(run_id)
+        if own_journal:
+            journal.close()
+        return {"clubs": 0, "elapsed_seconds": 0.0, "workers": [], "steps": {}, "pool": {}, "rate_limiter": {},
+                "run": {"id": run_id, "skipped": len(dict.fromkeys(clubs)), "statuses": run}}
+    max_threads = max(1, min(max_threads, queue.total))
+    logger.info(f"Queued {queue.total} clubs for {max_threads} threads.")
+
+    own_pool = pool is None
+    if own_pool:
+        pool = create_scraper_pool(max_threads, timer, rate_limiter)
+    pool.warm(max_threads)
+
+    workers = [WorkerStats(f"worker-{i}") for i in range(max_threads)]
+    try:
+        with ThreadPoolExecutor(max_threads) as executor:
+            futures = [executor.submit(scrape_worker, queue, pool, stats, journal) for stats in workers]
+
+            # Wait for all threads to complete
+            for future in futures:
+                try:
+                    future.result()  # This raises any exception that occurred during task execution
+                except Exception as e:
+                    logger.error(f"An error occurred in a thread: {e}")
+    finally:
+        if own_pool:
+            pool.close()
+        save_scrape_stats(queue.stats)
+
+    # Only reached when every club was attempted; a crash leaves the run open for the next one to resume
+    run = journal.finish_run(run_id)
+    if own_journal:
+        journal.close()
+
+    report = {
+        "clubs": queue.total,
+        "elapsed_seconds": round(time.monotonic() - started, 2),
+        "workers": [stats.to_dict() for stats in workers],
+        "steps": timer.report(),
+        "pool": dict(pool.stats),
+        "rate_limiter": rate_limiter.report(),
+        "run": {"id": run_id, "skipped": len(dict.fromkeys(clubs)) - queue.total, "statuses": run},
+    }
+    for entry in report["workers"]:
+        logger.info(f"Scrape worker stats: {entry}")
+    timer.log_report()
+    return report
 if __name__ == "__main__":
     # Set your Instagram credentials here
 
@@ -0,0 +1,103 @@
+import gzip
+import json
+import os
+import sys
+import time
+from threading import Lock
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from tools.artifacts import compute_etag, get_artifact_meta
+from tools.logger import logger
+
+# How often the manifest files on disk are checked for a version published by another worker
+MANIFEST_REVALIDATE_SECONDS = 30
+
+
+class ManifestSnapshot:
+    """One immutable version of manifest.json: its entries, served bytes, validators and variants."""
+
+    __slots__ = ('entries', 'body', 'etag', 'last_modified', 'encodings', 'stamp')
+
+    def __init__(self, entries: tuple, body: bytes, etag: str, last_modified: int, encodings: dict, stamp):
+        self.entries = entries
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        # Content-Encoding -> compressed body, in order of preference
+        self.encodings = encodings
+        self.stamp = stamp
+
+    @property
+    def source(self) -> bytes:
+        """The uncompressed body."""
+        return self.body
+
+
+class ManifestStore:
+    """
+    Holds the current ManifestSnapshot in memory. /club-manifest is answered from it
+    without any disk access; a new version is loaded and swapped in with a single
+    reference assignment, so requests in flight keep the version they started with.
+    """
+
+    def __init__(self, retriever):
+        self.retriever = retriever
+        self._snapshot = None
+        self._checked_at = 0.0
+        self._lock = Lock()
+
+    def current(self) -> ManifestSnapshot:
+        """Returns the live snapshot, picking up a newer manifest.json at most every MANIFEST_REVALIDATE_SECONDS."""
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - self._checked_at < MANIFEST_REVALIDATE_SECONDS:
+            return snapshot
+
+        with self._lock:
+            if self._snapshot is None or time.monotonic() - self._checked_at >= MANIFEST_REVALIDATE_SECONDS:
+                meta = get_artifact_meta(self.retriever.get_manifest_path())
+                if self._snapshot is None or self._stamp(meta) != self._snapshot.stamp:
+                    try:
+                        self._snapshot = self._load(meta)
+                    except (OSError, ValueError) as e:
+                        if self._snapshot is None:
+                            raise
+                        logger.error(f"Unable to load the new manifest, keeping the current one: {e}")
+                self._checked_at = time.monotonic()
+            return self._snapshot
+
+    def reload(self) -> ManifestSnapshot:
+        """Loads the manifest the reload job just published and swaps it in."""
+        with self._lock:
+            self._snapshot = self._load(get_artifact_meta(self.retriever.get_manifest_path()))
+            self._checked_at = time.monotonic()
+            return self._snapshot
+
+    def _stamp(self, meta):
+        """What identifies a version on disk: the sidecar stamp, or the file mtime when there is no sidecar."""
+        if meta is not None:
+            return meta.stamp
+        try:
+            return os.stat(self.retriever.get_manifest_path()).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _load(self, meta) -> ManifestSnapshot:
+        with open(self.retriever.get_manifest_path(), 'rb') as file:
+            body = file.read()
+            modified = int(os.fstat(file.fileno()).st_mtime)
+        entries = tuple(json.loads(body))
+
+        if meta is not None:
+            # Validators and variants written by the pipeline alongside the file
+            encodings = {}
+            for encoding, variant_path in meta.encodings.items():
+                with open(variant_path, 'rb') as file:
+                    encodings[encoding] = file.read()
+            snapshot = ManifestSnapshot(entries, body, meta.etag, meta.last_modified, encodings, self._stamp(meta))
+        else:
+            # No sidecar (e.g. the manifest shipped with the repo): compute them once here, dated by the
+            # file so every worker and restart sends the same Last-Modified for the same bytes
+            snapshot = ManifestSnapshot(entries, body, compute_etag(body), modified,
+                                        {'gzip': gzip.compress(body, compresslevel=9, mtime=0)}, self._stamp(meta))
+
+        logger.info(f"Manifest with {len(entries)} clubs loaded into memory.")
+        return snapshot
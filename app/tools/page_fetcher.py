@@ -0,0 +1,246 @@
+import base64
+from abc import ABC, abstractmethod
+import json
+import os
+import re
+import sys
+import time
+from datetime import datetime, timezone
+from threading import Lock
+import dotenv
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from tools.logger import logger
+from tools.rate_limiter import AdaptiveRateLimiter
+from tools.extractors import (Extractor, get_extractor, find_meta, find_post_fields, find_club_post_links,
+                              find_club_links)
+
+dotenv.load_dotenv()
+
+INSTAGRAM_URL = "https://www.instagram.com"
+# Point the HTTP fetcher at a local stand-in server (e.g. one serving saved HTML fixtures)
+INSTAGRAM_BASE_URL = os.getenv('INSTAGRAM_BASE_URL', INSTAGRAM_URL).rstrip('/')
+HTTP_FETCH_ENABLED = os.getenv('HTTP_FETCH_ENABLED', 'true').lower() == 'true'
+HTTP_FETCH_TIMEOUT = int(os.getenv('HTTP_FETCH_TIMEOUT', 10))
+# Kept-alive connections per host, shared by every scraping thread
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', 16))
+# Pages in a row the HTTP path may miss (refused, or not server-rendered) before the fetcher stops
+# being tried for the rest of its run, so a miss does not cost every page a second request; 0 never stops
+HTTP_FETCH_MAX_MISSES = int(os.getenv('HTTP_FETCH_MAX_MISSES', 5))
+# Statuses that mean Instagram is refusing this client rather than that the page is missing
+BLOCKED_STATUSES = (403, 429)
+
+HTTP_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) "
+                  "Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+}
+DEFAULT_PICTURE = "http://www.w3.org/2000/svg"
+
+# Fields of the JSON Instagram embeds in its pages
+TAKEN_AT_PATTERN = re.compile(r'"taken_at(?:_timestamp)?"\s*:\s*(\d{9,})')
+CAPTION_PATTERN = re.compile(r'"caption"\s*:\s*\{[^{}]*?"text"\s*:\s*"((?:[^"\\]|\\.)*)"')
+DISPLAY_URL_PATTERN = re.compile(r'"display_(?:url|uri)"\s*:\s*"((?:[^"\\]|\\.)*)"')
+SHORTCODE_PATTERN = re.compile(r'"shortcode"\s*:\s*"([A-Za-z0-9_-]{5,})"')
+COUNTS_PATTERN = re.compile(r'([\d,.]+[KkMm]?) Followers, ([\d,.]+[KkMm]?) Following, ([\d,.]+[KkMm]?) Posts')
+
+
+class FetchError(Exception):
+    """A page could not be fetched over plain HTTP; the caller should use the browser."""
+
+
+class PageFetcher(ABC):
+    """Interface of the page sources the scraper can read from."""
+
+    @abstractmethod
+    def fetch(self, url: str) -> str:
+        """
+        :param url: an instagram.com URL
+        :return: the page's HTML
+        :raises FetchError: when the page is not available through this fetcher
+        """
+
+
+class HttpFetcher(PageFetcher):
+    """
+    Fetches pages with one pooled requests.Session shared across threads, carrying the same
+    session cookies as the logged-in browser. No JavaScript runs, so a page only helps when
+    the data is in the server-rendered HTML; callers fall back to Selenium otherwise, and
+    report every page through report_page so the fetcher turns itself off (see available)
+    once it keeps missing.
+    """
+
+    def __init__(self, base_url: str = INSTAGRAM_BASE_URL, timeout: int = HTTP_FETCH_TIMEOUT,
+                 pool_size: int = HTTP_POOL_SIZE, rate_limiter: AdaptiveRateLimiter = None,
+                 max_misses: int = HTTP_FETCH_MAX_MISSES):
+        """
+        :param rate_limiter: paces requests together with the browser sessions and learns from responses
+        :param max_misses: pages in a row that may miss before the fetcher is unavailable, 0 for no limit
+        """
+        self.base_url = base_url.rstrip('/')
+        self.rate_limiter = rate_limiter
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update(HTTP_HEADERS)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size,
+                              max_retries=Retry(total=2, backoff_factor=0.5, status_forcelist=(500, 502, 503, 504)))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._cookie_lock = Lock()
+        self.max_misses = max_misses
+        self._misses = 0
+        self._misses_lock = Lock()
+        self.stats = {"fetched": 0, "failed": 0}
+        self._load_env_cookies()
+
+    @property
+    def available(self) -> bool:
+        """False once max_misses pages in a row were refused or not server-rendered."""
+        return not self.max_misses or self._misses < self.max_misses
+
+    def report_page(self, hit: bool) -> None:
+        """:param hit: whether the page fetched carried the data, so the browser was not needed"""
+        with self._misses_lock:
+            if hit:
+                self._misses = 0
+                return
+            self._misses += 1
+            opened = self._misses == self.max_misses
+        if opened:
+            logger.warning(f"HTTP fetching missed {self.max_misses} pages in a row; using the browser only from now on.")
+
+    def fetch(self, url: str) -> str:
+        target = self.base_url + url[len(INSTAGRAM_URL):] if url.startswith(INSTAGRAM_URL) else url
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        start = time.monotonic()
+        try:
+            response = self.session.get(target, timeout=self.timeout)
+        except requests.RequestException as e:
+            self.stats["failed"] += 1
+            self._report("error")
+            raise FetchError(f"GET {target} failed: {e}") from e
+
+        if (response.status_code in BLOCKED_STATUSES or '/accounts/login' in response.url
+                or '/challenge' in response.url):
+            self.stats["failed"] += 1
+            self._report("blocked")
+            raise FetchError(f"GET {target} was refused ({response.status_code}, {response.url})")
+        if response.status_code != 200:
+            self.stats["failed"] += 1
+            # A missing page is no sign of throttling, but it is no success to speed up on either
+            if response.status_code >= 500:
+                self._report("error")
+            raise FetchError(f"GET {target} answered {response.status_code} ({response.url})")
+        self.stats["fetched"] += 1
+        self._report(None, time.monotonic() - start)
+        return response.text
+
+    def _report(self, trouble: str = None, seconds: float = 0.0) -> None:
+        if self.rate_limiter is None:
+            return
+        if trouble is None:
+            self.rate_limiter.report_success(seconds)
+        else:
+            self.rate_limiter.report_trouble(trouble)
+
+    def has_session(self) -> bool:
+        return 'sessionid' in self.session.cookies
+
+    def set_user_agent(self, user_agent: str) -> None:
+        """Sends requests as the browser whose cookies the session carries, see load_cookies."""
+        if user_agent:
+            self.session.headers["User-Agent"] = user_agent
+
+    def load_cookies(self, cookies: list[dict]) -> None:
+        """Copies cookies in WebDriver's format (dicts with name/value/domain/path) into the session."""
+        with self._cookie_lock:
+            for cookie in cookies:
+                self.session.cookies.set(cookie['name'], cookie['value'],
+                                         domain=cookie.get('domain', '.instagram.com'), path=cookie.get('path', '/'))
+
+    def _load_env_cookies(self) -> None:
+        cookies_str = os.getenv('COOKIE')
+        if not cookies_str:
+            return
+        try:
+            self.load_cookies(json.loads(base64.b64decode(cookies_str).decode('utf-8')))
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Unable to load COOKIE into the HTTP session: {e}")
+
+
+def _unescape(value: str) -> str:
+    return json.loads(f'"{value}"')
+
+
+def parse_post_page(html: str, extractor: Extractor = None):
+    """
+    Reads a post's caption, date and picture from server-rendered HTML, from the markup the
+    browser path uses or from the embedded page data. A login wall or an unhydrated app shell
+    (like debug_post_source.html) carries neither, so it yields None.
+    :param extractor: HTML backend, defaults to HTML_EXTRACTOR
+    :return: (description, date, picture), or None when the page does not carry the post
+    """
+    if not html:
+        return None
+    page = (extractor or get_extractor()).load(html)
+    caption, date, picture = find_post_fields(page)
+
+    if not date:
+        taken_at = TAKEN_AT_PATTERN.search(html)
+        if taken_at:
+            date = datetime.fromtimestamp(int(taken_at.group(1)), timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+    if not date:
+        return None
+
+    if caption is None:
+        match = CAPTION_PATTERN.search(html)
+        caption = _unescape(match.group(1)) if match else ""
+
+    if not picture:
+        display_url = DISPLAY_URL_PATTERN.search(html)
+        picture = _unescape(display_url.group(1)) if display_url else find_meta(page, property='og:image')
+
+    return caption, date, picture or DEFAULT_PICTURE
+
+
+def parse_profile_page(html: str, club_username: str, extractor: Extractor = None):
+    """
+    Reads a profile from server-rendered HTML: name, picture, bio, counts, bio links and recent posts.
+    :param extractor: HTML backend, defaults to HTML_EXTRACTOR
+    :return: the club_info dictionary, or None when the page lacks any of the required fields
+    """
+    if not html:
+        return None
+    page = (extractor or get_extractor()).load(html)
+
+    description = find_meta(page, name='description') or find_meta(page, property='og:description')
+    counts = COUNTS_PATTERN.search(description or "")
+    if not counts:
+        return None
+    followers_count, following_count, posts_count = (count.replace(',', '') for count in counts.groups())
+    club_description = description.split(' - ')[1:]
+
+    title = find_meta(page, property='og:title') or ""
+    club_name = title.split(' (@')[0].strip() or None
+    pfp_tag = page.find("img", alt=f"{club_username}'s profile picture")
+    pfp_url = pfp_tag.get("src") if pfp_tag else find_meta(page, property='og:image')
+
+    post_links = list(dict.fromkeys(find_club_post_links(page)))
+    if not post_links:
+        post_links = [f"{INSTAGRAM_URL}/p/{code}/" for code in dict.fromkeys(SHORTCODE_PATTERN.findall(html))]
+    if not (club_name and pfp_url and post_links):
+        return None
+
+    return {"Instagram Handle": club_username,
+            "Club Name": club_name,
+            "Profile Picture": pfp_url,
+            "Description": club_description,
+            "Followers": followers_count,
+            "Following": following_count,
+            "Post Count": posts_count,
+            "Club Links": find_club_links(page),
+            "Recent Posts": post_links}
@@ -0,0 +1,224 @@
+import multiprocessing
+import os
+import sys
+import time
+from queue import Empty
+import dotenv
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from tools.logger import logger
+from tools.step_timer import StepTimer
+from tools.rate_limiter import (AdaptiveRateLimiter, SCRAPE_RATE_PER_MINUTE, SCRAPE_RATE_MIN_PER_MINUTE,
+                                SCRAPE_RATE_MAX_PER_MINUTE, SCRAPE_BURST)
+from tools.scrape_journal import ScrapeJournal
+from tools.scrape_queue import ClubQueue, WorkerStats, load_scrape_stats, save_scrape_stats
+from tools.insta_scraper import (InstagramScraper, DATA_DIR, SCRAPE_THREADS, create_scraper_pool, run_with_retries,
+                                 multi_threaded_scrape)
+
+dotenv.load_dotenv()
+
+# "threads" scrapes in one process; "processes" runs SCRAPE_PROCESSES worker processes, each with its own browser
+SCRAPE_MODE = os.getenv('SCRAPE_MODE', 'threads')
+# Every worker runs its own Chrome and logs the same account in, so keep this low whatever the core count
+SCRAPE_PROCESSES = int(os.getenv('SCRAPE_PROCESSES', 2))
+# How often the coordinator checks for worker processes that died without reporting
+WORKER_POLL_SECONDS = 5
+
+
+def scrape_process_worker(name: str, tasks, results, rate_share: float) -> None:
+    """
+    Body of a worker process: logs its own browser in, then scrapes the clubs the coordinator
+    hands it and sends back what it collected. Nothing is written to disk here.
+
+    Messages put on results: ("result", name, club, data or None, seconds) per club and, last,
+    ("done", name, step durations, rate limiter report, pool stats).
+    :param tasks: this worker's own queue of clubs, ended by None
+    :param rate_share: this process's fraction of the configured request rate
+    """
+    timer = StepTimer()
+    rate_limiter = AdaptiveRateLimiter(SCRAPE_RATE_PER_MINUTE * rate_share, max(1, round(SCRAPE_BURST * rate_share)),
+                                       SCRAPE_RATE_MIN_PER_MINUTE * rate_share, SCRAPE_RATE_MAX_PER_MINUTE * rate_share)
+    pool = create_scraper_pool(1, timer, rate_limiter)
+    try:
+        while True:
+            club = tasks.get()
+            if club is None:
+                break
+            start = time.monotonic()
+            ok, data = run_with_retries(pool, club, lambda scraper: scraper.collect_club_data(club))
+            results.put(("result", name, club, data if ok else None, time.monotonic() - start))
+    finally:
+        pool.close()
+        results.put(("done", name, timer.snapshot(), rate_limiter.report(), dict(pool.stats)))
+
+
+def _sum_reports(reports: list[dict]) -> dict:
+    """Adds up the numeric fields of the per-process reports."""
+    total = {}
+    for report in reports:
+        for key, value in report.items():
+            if isinstance(value, (int, float)):
+                total[key] = round(total.get(key, 0) + value, 2)
+    return total
+
+
+def multi_process_scrape(clubs: list[str], processes: int = SCRAPE_PROCESSES, timer: StepTimer = None,
+                         journal: ScrapeJournal = None, data_dir: str = DATA_DIR) -> dict:
+    """
+    Scrapes with several worker processes, so parsing in one worker does not wait on
+    another's GIL. Each worker owns its browser, HTTP session and parser, and sends the data
+    it collected back over a queue; this process is the only one writing to disk (club data,
+    journal, scrape stats).
+
+    Clubs are handed out from the same priority queue as multi_threaded_scrape, one per idle
+    worker. The request rate is split evenly between the workers. A worker that dies fails
+    its current club and the run goes on with the others; if all of them die, the run is left
+    unfinished in the journal for the next one to resume.
+
+    Args:
+        clubs (list[str]): Instagram usernames of clubs.
+        processes (int): Number of worker processes.
+        timer (StepTimer): receives the workers' per-step durations.
+        journal (ScrapeJournal): as for multi_threaded_scrape.
+        data_dir (str): where club data is written.
+    Returns:
+        dict: run report, shaped like multi_threaded_scrape's.
+    """
+    started = time.monotonic()
+    timer = timer or StepTimer()
+    own_journal = journal is None
+    if own_journal:
+        journal = ScrapeJournal()
+    run_id, remaining = journal.begin_run(clubs)
+    queue = ClubQueue(remaining, load_scrape_stats())
+    if not queue.total:
+        run = journal.finish_run(run_id)
+        if own_journal:
+            journal.close()
+        return {"clubs": 0, "elapsed_seconds": 0.0, "workers": [], "steps": {}, "pool": {}, "rate_limiter": {},
+                "run": {"id": run_id, "skipped": len(dict.fromkeys(clubs)), "statuses": run}}
+    processes = max(1, min(processes, queue.total))
+    logger.info(f"Queued {queue.total} clubs for {processes} processes.")
+
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    workers = {f"process-{i}": WorkerStats(f"process-{i}") for i in range(processes)}
+    tasks = {name: context.Queue() for name in workers}
+    worker_processes = {name: context.Process(target=scrape_process_worker,
+                                              args=(name, tasks[name], results, 1 / processes), name=name, daemon=True)
+                        for name in workers}
+    running = dict(worker_processes)
+    writer = InstagramScraper(None, None, data_dir=data_dir, browser=False)
+    # The club each worker is on and when it was handed out
+    assigned = {}
+    pools, limiters = [], []
+
+    def dispatch(name: str) -> None:
+        """Hands the worker the next club, or tells it to stop and report once none are left."""
+        if not worker_processes[name].is_alive():
+            return
+        club = queue.pop()
+        if club is None:
+            tasks[name].put(None)
+            return
+        journal.mark_running(club)
+        assigned[name] = (club, time.monotonic())
+        tasks[name].put(club)
+
+    def finish(name: str, club: str, data, seconds: float) -> None:
+        ok = data is not None
+        if ok:
+            try:
+                writer.store_club_result(data)
+            except Exception as e:
+                logger.error(f"Unable to store {club}: {e}")
+                ok = False
+        if ok:
+            journal.mark_done(club)
+        else:
+            journal.mark_failed(club, "retries exhausted" if data is None else "store failed")
+        queue.record(club, seconds, ok)
+        workers[name].record(seconds, ok)
+
+    def stopped(name: str, reason: str) -> None:
+        """A worker is gone: the club it was on, if any, failed."""
+        running.pop(name, None)
+        workers[name].finished_at = time.monotonic()
+        if name in assigned:
+            club, handed_out = assigned.pop(name)
+            logger.error(f"Scrape worker {name} {reason} while on {club}.")
+            finish(name, club, None, time.monotonic() - handed_out)
+
+    def handle(message: tuple) -> None:
+        kind, name = message[0], message[1]
+        if kind == "result":
+            club, data, seconds = message[2:]
+            assigned.pop(name, None)
+            finish(name, club, data, seconds)
+            dispatch(name)
+        elif kind == "done":
+            timer.merge(message[2])
+            limiters.append(message[3])
+            pools.append(message[4])
+            stopped(name, "stopped")
+
+    try:
+        for name, process in running.items():
+            process.start()
+            dispatch(name)
+
+        # Until every worker has reported done or died; liveness is checked after every message, so a
+        # dead worker's club is failed even while the others keep the results queue busy
+        while running:
+            try:
+                handle(results.get(timeout=WORKER_POLL_SECONDS))
+            except Empty:
+                pass
+            dead = [name for name, process in running.items() if not process.is_alive()]
+            if not dead:
+                continue
+            # What they sent before exiting is already queued: take it before failing their club
+            while True:
+                try:
+                    handle(results.get_nowait())
+                except Empty:
+                    break
+            for name in dead:
+                if name in running:
+                    stopped(name, f"exited with code {worker_processes[name].exitcode}")
+    finally:
+        for process in running.values():
+            if process.is_alive():
+                process.terminate()
+        for process in worker_processes.values():
+            if process.pid is not None:
+                process.join(WORKER_POLL_SECONDS)
+        save_scrape_stats(queue.stats)
+
+    complete = not len(queue)
+    # A run cut short by dead workers stays open for the next one to resume
+    run = journal.finish_run(run_id) if complete else {}
+    if own_journal:
+        journal.close()
+
+    report = {
+        "clubs": queue.total,
+        "elapsed_seconds": round(time.monotonic() - started, 2),
+        "workers": [stats.to_dict() for stats in workers.values()],
+        "steps": timer.report(),
+        "pool": _sum_reports(pools),
+        "rate_limiter": _sum_reports(limiters),
+        "run": {"id": run_id, "skipped": len(dict.fromkeys(clubs)) - queue.total, "statuses": run},
+    }
+    for entry in report["workers"]:
+        logger.info(f"Scrape worker stats: {entry}")
+    timer.log_report()
+    return report
+
+
+def run_scrape(clubs: list[str]) -> dict:
+    """Scrapes the clubs in the configured SCRAPE_MODE, see multi_threaded_scrape and multi_process_scrape."""
+    if SCRAPE_MODE == 'processes':
+        logger.info(f"initiating scraping with {SCRAPE_PROCESSES} processes")
+        return multi_process_scrape(clubs, SCRAPE_PROCESSES)
+    logger.info(f"initiating scraping with {SCRAPE_THREADS} threads")
+    return multi_threaded_scrape(clubs, SCRAPE_THREADS)
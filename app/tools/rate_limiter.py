@@ -0,0 +1,105 @@
+import os
+import sys
+import time
+from threading import Lock
+import dotenv
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from tools.logger import logger
+
+dotenv.load_dotenv()
+
+# Request budget shared by every scraping thread, in page requests per minute
+SCRAPE_RATE_PER_MINUTE = float(os.getenv('SCRAPE_RATE_PER_MINUTE', 40))
+SCRAPE_RATE_MIN_PER_MINUTE = float(os.getenv('SCRAPE_RATE_MIN_PER_MINUTE', 4))
+SCRAPE_RATE_MAX_PER_MINUTE = float(os.getenv('SCRAPE_RATE_MAX_PER_MINUTE', 90))
+# Requests that may go out back to back after an idle period
+SCRAPE_BURST = int(os.getenv('SCRAPE_BURST', 5))
+
+# Rate multiplier applied per kind of trouble
+BACKOFF_FACTORS = {"blocked": 0.25, "error": 0.6, "slow": 0.85}
+# Everyone pauses this long after a login wall / 429, doubled for each one in a row
+BLOCK_COOLDOWN_SECONDS = 60
+MAX_BLOCK_COOLDOWN_SECONDS = 15 * 60
+# A response slower than this counts as a sign of throttling
+SLOW_RESPONSE_SECONDS = 8.0
+# After this many healthy responses in a row the rate grows by RECOVERY_STEP of the configured rate
+RECOVERY_STREAK = 10
+RECOVERY_STEP = 0.1
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket shared by all scraping threads. Every page request takes a token; callers
+    that find the bucket empty reserve the next slot and sleep until it, so threads are served
+    in order at the current rate.
+
+    The rate adapts: it is cut multiplicatively on login walls/429s (which also pause every
+    thread for a cooldown), errors and slow responses, and grows additively back towards the
+    maximum while responses stay healthy.
+    """
+
+    def __init__(self, rate_per_minute: float = SCRAPE_RATE_PER_MINUTE, burst: int = SCRAPE_BURST,
+                 min_rate_per_minute: float = SCRAPE_RATE_MIN_PER_MINUTE,
+                 max_rate_per_minute: float = SCRAPE_RATE_MAX_PER_MINUTE):
+        self._lock = Lock()
+        self._min_rate = min_rate_per_minute / 60
+        self._max_rate = max(max_rate_per_minute, rate_per_minute) / 60
+        self._step = rate_per_minute / 60 * RECOVERY_STEP
+        self._rate = rate_per_minute / 60
+        self._burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._cooldown = BLOCK_COOLDOWN_SECONDS
+        self._streak = 0
+        self.stats = {"requests": 0, "waited_seconds": 0.0, "blocked": 0, "error": 0, "slow": 0}
+
+    @property
+    def rate_per_minute(self) -> float:
+        return round(self._rate * 60, 2)
+
+    def acquire(self) -> float:
+        """Blocks until this caller may send a request. :return: seconds waited"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self._burst, self._tokens + (now - self._updated) * self._rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self._rate if self._tokens < 0 else 0.0
+            wait = max(wait, self._paused_until - now)
+            self.stats["requests"] += 1
+            self.stats["waited_seconds"] = round(self.stats["waited_seconds"] + wait, 2)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def report_success(self, seconds: float) -> None:
+        """A healthy response that took `seconds`; slow ones count as trouble."""
+        if seconds >= SLOW_RESPONSE_SECONDS:
+            self.report_trouble("slow")
+            return
+        with self._lock:
+            self._streak += 1
+            self._cooldown = BLOCK_COOLDOWN_SECONDS
+            if self._streak >= RECOVERY_STREAK and self._rate < self._max_rate:
+                self._rate = min(self._max_rate, self._rate + self._step)
+                self._streak = 0
+
+    def report_trouble(self, kind: str) -> None:
+        """:param kind: "blocked" (login wall, 429), "error" or "slow" """
+        with self._lock:
+            self._streak = 0
+            self._rate = max(self._min_rate, self._rate * BACKOFF_FACTORS[kind])
+            self.stats[kind] += 1
+            if kind == "blocked":
+                self._paused_until = max(self._paused_until, time.monotonic() + self._cooldown)
+                cooldown, self._cooldown = self._cooldown, min(MAX_BLOCK_COOLDOWN_SECONDS, self._cooldown * 2)
+            rate = self.rate_per_minute
+        if kind == "blocked":
+            logger.warning(f"Instagram is pushing back; pausing scraping for {cooldown}s at {rate} requests/min.")
+        else:
+            logger.info(f"Scrape rate lowered to {rate} requests/min after a {kind} response.")
+
+    def report(self) -> dict:
+        with self._lock:
+            return {**self.stats, "rate_per_minute": self.rate_per_minute}
@@ -1,4 +1,7 @@
 import os
+import shutil
+import tempfile
+import uuid
 import boto3
 import dotenv
 import logging
@@ -56,40 +59,60 @@ class S3Client:
     def _download_directory(self, s3_directory: str, local_directory: str):
         """
         Downloads all files in a specific directory from S3 to a local directory,
-        maintaining the file hierarchy structure.
+        maintaining the file hierarchy structure. Files are downloaded into a staging
+        directory next to the target which is then renamed into place, so readers never
+        see a half-downloaded directory.
 
         :param s3_directory: The S3 directory (prefix) to fetch files from.
         :param local_directory: The local directory to save the files to.
         """
-        # Get all files in the S3 directory
+        # Get all files in the S3 directory; .etag sidecars go last so they are never
+        # older than the file they describe
         file_keys = self.get_all_files_in_directory(s3_directory)
+        file_keys.sort(key=lambda key: key.endswith('.etag'))
+        if not file_keys:
+            raise FileNotFoundError(f"No files found in s3://{self.bucket_name}/{s3_directory}")
         
-        # Ensure the local directory exists
-        if not os.path.exists(local_directory):
-            os.makedirs(local_directory)
+        local_directory = os.path.abspath(local_directory)
+        parent_directory = os.path.dirname(local_directory)
+        os.makedirs(parent_directory, exist_ok=True)
+        staging_directory = tempfile.mkdtemp(dir=parent_directory, prefix=f".{os.path.basename(local_directory)}.")
         
-        # Download each file
-        for file_key in file_keys:
-            # Construct the local file path
-            relative_path = os.path.relpath(file_key, s3_directory)  # Preserve relative path
-            local_file_path = os.path.join(local_directory, relative_path)
+        try:
+            # Download each file
+            for file_key in file_keys:
+                # Construct the local file path
+                relative_path = os.path.relpath(file_key, s3_directory)  # Preserve relative path
+                local_file_path = os.path.join(staging_directory, relative_path)
+                
+                # Ensure the local directory for the file exists
+                os.makedirs(os.path.dirname(local_file_path), exist_ok=True)
             
-            # Ensure the local directory for the file exists
-            local_file_dir = os.path.dirname(local_file_path)
-            if not os.path.exists(local_file_dir):
-                os.makedirs(local_file_dir)
+                # Download the file
+                self.s3.download_file(self.bucket_name, file_key, local_file_path)
+                self.logger.info(f"Downloaded: {file_key} to {local_file_path}")
             
-            # Skip downloading if the file already exists
-            if os.path.exists(local_file_path):
-                self.logger.info(f"File already exists: {local_file_path}, skipping download.")
-                continue
+            os.chmod(staging_directory, 0o755)  # mkdtemp creates directories private to the owner
+            self._swap_directory(staging_directory, local_directory)
+        except BaseException:
+            shutil.rmtree(staging_directory, ignore_errors=True)
+            raise
+
+    def _swap_directory(self, staging_directory: str, local_directory: str):
+        """Renames a fully downloaded staging directory over the target directory."""
+        if not os.path.exists(local_directory):
+            os.rename(staging_directory, local_directory)
+            return
         
-            # Download the file
-            self.s3.download_file(self.bucket_name, file_key, local_file_path)
-            self.logger.info(f"Downloaded: {file_key} to {local_file_path}")
+        # Directories cannot be renamed over non-empty ones, so move the old one aside first
+        old_directory = f"{local_directory}.old-{uuid.uuid4().hex}"
+        os.rename(local_directory, old_directory)
+        os.rename(staging_directory, local_directory)
+        shutil.rmtree(old_directory, ignore_errors=True)
                 
-    def download_instagram_directory(self, instagram: str):
-        self._download_directory(f'data/{instagram}', f'./data/{instagram}')
+    def download_instagram_directory(self, instagram: str, local_data_dir: str = './data'):
+        # Trailing slash so that e.g. "uci" does not also match "ucigaming"
+        self._download_directory(f'data/{instagram}/', os.path.join(local_data_dir, instagram))
         
 
     def delete_directory(self, instagram: str):
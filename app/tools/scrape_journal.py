@@ -0,0 +1,122 @@
+import os
+import sqlite3
+import sys
+import time
+from threading import Lock
+import dotenv
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from tools.logger import logger
+
+dotenv.load_dotenv()
+
+# Kept next to jobs.sqlite, outside data/ so it is neither uploaded nor replaced by hydration
+SCRAPE_JOURNAL_PATH = os.getenv('SCRAPE_JOURNAL_PATH',
+                                os.path.join(os.path.dirname(__file__), "..", "..", "scrape_journal.sqlite"))
+# Clubs scraped successfully within this window are not scraped again
+SCRAPE_FRESHNESS_HOURS = float(os.getenv('SCRAPE_FRESHNESS_HOURS', 24))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE TABLE IF NOT EXISTS clubs (
+    club TEXT PRIMARY KEY,
+    run_id INTEGER,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL,
+    last_success_at REAL,
+    error TEXT
+);
+"""
+
+
+class ScrapeJournal:
+    """
+    Persistent record of scrape runs and of every club's status in them ("pending", "running",
+    "done", "failed"). A run that never finished (dyno restart, crash) is resumed by the next
+    one from the clubs it had not marked done, so an interrupted run does not cost a full
+    re-scrape; a new run skips clubs scraped within the freshness window. A club is only
+    marked done once its data was stored.
+    """
+
+    def __init__(self, path: str = SCRAPE_JOURNAL_PATH, freshness_hours: float = SCRAPE_FRESHNESS_HOURS):
+        self.path = path
+        self.freshness_seconds = freshness_hours * 3600
+        self._lock = Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(SCHEMA)
+
+    def unfinished_run(self):
+        """:return: id of the latest run that was started but never finished, or None"""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT id FROM runs WHERE finished_at IS NULL ORDER BY id DESC LIMIT 1").fetchone()
+        return row[0] if row else None
+
+    def begin_run(self, clubs: list[str]) -> tuple[int, list[str]]:
+        """
+        Resumes the unfinished run, skipping the clubs it marked done, or starts a new one,
+        skipping the clubs scraped within the freshness window.
+        :return: (run id, the clubs still to scrape, in the given order)
+        """
+        now = time.time()
+        run_id = self.unfinished_run()
+        with self._lock, self._connection:
+            resumed = run_id is not None
+            if resumed:
+                logger.info(f"Resuming interrupted scrape run {run_id}.")
+                finished = {club for club, in self._connection.execute(
+                    "SELECT club FROM clubs WHERE run_id = ? AND status = 'done'", (run_id,))}
+            else:
+                run_id = self._connection.execute("INSERT INTO runs (started_at) VALUES (?)", (now,)).lastrowid
+                logger.info(f"Scrape run {run_id} started.")
+                finished = {club for club, in self._connection.execute(
+                    "SELECT club FROM clubs WHERE last_success_at >= ?", (now - self.freshness_seconds,))}
+            remaining = [club for club in dict.fromkeys(clubs) if club not in finished]
+            self._connection.executemany(
+                "INSERT INTO clubs (club, run_id, status, updated_at) VALUES (?, ?, 'pending', ?) "
+                "ON CONFLICT(club) DO UPDATE SET run_id = excluded.run_id, status = 'pending', "
+                "updated_at = excluded.updated_at, attempts = 0, error = NULL",
+                [(club, run_id, now) for club in remaining])
+
+        skipped = len(dict.fromkeys(clubs)) - len(remaining)
+        if skipped and resumed:
+            logger.info(f"Skipping {skipped} clubs run {run_id} already scraped.")
+        elif skipped:
+            logger.info(f"Skipping {skipped} clubs scraped within the last {self.freshness_seconds / 3600:g}h.")
+        return run_id, remaining
+
+    def mark_running(self, club: str) -> None:
+        self._update(club, "running", attempts=True)
+
+    def mark_done(self, club: str) -> None:
+        self._update(club, "done", success=True)
+
+    def mark_failed(self, club: str, error: str = None) -> None:
+        self._update(club, "failed", error=error)
+
+    def finish_run(self, run_id: int) -> dict:
+        """Closes the run. :return: number of clubs per status in it"""
+        with self._lock, self._connection:
+            self._connection.execute("UPDATE runs SET finished_at = ? WHERE id = ?", (time.time(), run_id))
+            counts = dict(self._connection.execute(
+                "SELECT status, COUNT(*) FROM clubs WHERE run_id = ? GROUP BY status", (run_id,)).fetchall())
+        logger.info(f"Scrape run {run_id} finished: {counts}")
+        return counts
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def _update(self, club: str, status: str, attempts: bool = False, success: bool = False,
+                error: str = None) -> None:
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "UPDATE clubs SET status = ?, updated_at = ?, attempts = attempts + ?, error = ?, "
+                "last_success_at = CASE WHEN ? THEN ? ELSE last_success_at END WHERE club = ?",
+                (status, now, int(attempts), error, int(success), now, club))
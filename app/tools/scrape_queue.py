@@ -0,0 +1,110 @@
+import heapq
+import json
+import os
+import sys
+import time
+from threading import Lock
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from tools.file_utils import atomic_write_json
+from tools.logger import logger
+
+# Per-club history of past scrapes, used to order the next run
+SCRAPE_STATS_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "scrape_stats.json")
+# Weight of the newest duration in the running average kept per club
+DURATION_SMOOTHING = 0.5
+
+
+def load_scrape_stats(path: str = SCRAPE_STATS_PATH) -> dict:
+    """:return: {club: {"seconds": average scrape time, "last_scraped": epoch of the last success, "failures": n}}"""
+    try:
+        with open(path, 'r') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning(f"Unable to read scrape stats, scheduling without them: {e}")
+        return {}
+
+
+def save_scrape_stats(stats: dict, path: str = SCRAPE_STATS_PATH) -> None:
+    try:
+        atomic_write_json(path, stats)
+    except OSError as e:
+        logger.error(f"Unable to save scrape stats: {e}")
+
+
+class ClubQueue:
+    """
+    Shared priority queue the scraping threads pull clubs from one at a time.
+
+    Clubs never scraped before come first, then the historically slowest, then the
+    least recently scraped. Starting the long jobs early and handing out the rest on
+    demand keeps every thread busy until the queue is empty, so a run takes about
+    total work / threads instead of the time of the unluckiest fixed chunk.
+    """
+
+    def __init__(self, clubs: list[str], stats: dict = None):
+        self.stats = stats if stats is not None else {}
+        self._lock = Lock()
+        self._heap = []
+        for order, club in enumerate(dict.fromkeys(clubs)):
+            heapq.heappush(self._heap, (self._priority(club), order, club))
+        self.total = len(self._heap)
+
+    def _priority(self, club: str) -> tuple:
+        history = self.stats.get(club)
+        if not history:
+            return (0, 0.0, 0.0)
+        return (1, -history.get('seconds', 0.0), history.get('last_scraped', 0.0))
+
+    def pop(self):
+        """:return: the next club to scrape, or None once the queue is drained"""
+        with self._lock:
+            if not self._heap:
+                return None
+            return heapq.heappop(self._heap)[2]
+
+    def record(self, club: str, seconds: float, ok: bool) -> None:
+        """Folds one finished scrape into the club's history."""
+        with self._lock:
+            history = self.stats.setdefault(club, {})
+            previous = history.get('seconds')
+            history['seconds'] = round(seconds if previous is None
+                                       else DURATION_SMOOTHING * seconds + (1 - DURATION_SMOOTHING) * previous, 2)
+            if ok:
+                history['last_scraped'] = int(time.time())
+                history['failures'] = 0
+            else:
+                history['failures'] = history.get('failures', 0) + 1
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+
+class WorkerStats:
+    """Throughput of one scraping thread."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.clubs = 0
+        self.failures = 0
+        self.busy_seconds = 0.0
+        self.started_at = time.monotonic()
+        self.finished_at = None
+
+    def record(self, seconds: float, ok: bool) -> None:
+        self.clubs += 1
+        self.busy_seconds += seconds
+        if not ok:
+            self.failures += 1
+
+    def to_dict(self) -> dict:
+        elapsed = (self.finished_at or time.monotonic()) - self.started_at
+        return {
+            "worker": self.name,
+            "clubs": self.clubs,
+            "failures": self.failures,
+            "busy_seconds": round(self.busy_seconds, 2),
+            "elapsed_seconds": round(elapsed, 2),
+            "clubs_per_minute": round(self.clubs * 60 / elapsed, 2) if elapsed > 0 else 0.0,
+        }
@@ -0,0 +1,179 @@
+import os
+import re
+import sys
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from tools.logger import logger
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset({
+    "a", "an", "and", "are", "at", "be", "by", "for", "from", "in", "is", "it", "of", "on", "or",
+    "our", "the", "to", "we", "with", "you", "your",
+})
+
+# Relative weight of a token by the field it was found in
+CLUB_FIELD_WEIGHTS = {"name": 4.0, "instagram": 3.0, "categories": 2.0, "description": 1.0}
+EVENT_FIELD_WEIGHTS = {"name": 3.0, "club": 1.5, "details": 1.0}
+# A query token that only prefixes an indexed token scores this fraction of an exact hit
+PREFIX_MATCH_FACTOR = 0.5
+
+
+def tokenize(text) -> list[str]:
+    """Lowercases, strips accents and splits text (or a list of texts) into searchable tokens."""
+    if text is None:
+        return []
+    if isinstance(text, (list, tuple)):
+        text = " ".join(str(part) for part in text)
+    text = unicodedata.normalize("NFKD", str(text)).encode("ascii", "ignore").decode("ascii").lower()
+    return [token for token in TOKEN_PATTERN.findall(text) if token not in STOPWORDS]
+
+
+class SearchSnapshot:
+    """One immutable version of the index; published whole, so a search never mixes two builds."""
+
+    __slots__ = ('postings', 'vocabulary', 'documents')
+
+    def __init__(self, postings: dict, vocabulary: tuple, documents: tuple):
+        self.postings = postings
+        self.vocabulary = vocabulary
+        self.documents = documents
+
+
+class SearchIndex:
+    """
+    In-memory inverted index over clubs (name, handle, genre/categories, description) and
+    their parsed events (name, details).
+
+    Each token maps to {document id: weight}. The sorted vocabulary is bisected for prefix
+    matches, so "hack" finds "hackathon". Every query token has to match a document, exactly
+    or by prefix; documents are ranked by the summed field weights of their matches.
+    """
+
+    def __init__(self, retriever):
+        self.retriever = retriever
+        self._snapshot = None
+
+    @property
+    def built(self) -> bool:
+        return self._snapshot is not None
+
+    def build(self) -> None:
+        """Re-indexes every club in club_manifest.json and the events of clubs with local data."""
+        postings = defaultdict(lambda: defaultdict(float))
+        documents = []
+
+        try:
+            clubs = self.retriever.fetch_club_manifest()
+        except (OSError, ValueError) as e:
+            logger.error(f"Unable to read the club manifest for the search index: {e}")
+            return
+
+        seen = set()
+        for club in clubs:
+            handle = club['instagram']
+            if handle in seen:
+                continue
+            seen.add(handle)
+
+            description = None
+            events = []
+            try:
+                snapshot = self.retriever.get_club_snapshot(handle)
+                description = (snapshot.info or {}).get('Description')
+                events = snapshot.events
+            except FileNotFoundError:
+                pass
+
+            doc_id = len(documents)
+            documents.append({"type": "club", "club": {
+                "name": club.get('name'),
+                "instagram": handle,
+                "genre": club.get('genre'),
+                "categories": club.get('categories', []),
+            }})
+            self._add(postings, doc_id, CLUB_FIELD_WEIGHTS, {
+                "name": club.get('name'),
+                "instagram": handle.replace('.', ' ').replace('_', ' '),
+                "categories": [club.get('genre'), *club.get('categories', [])],
+                "description": description,
+            })
+
+            for event in events:
+                doc_id = len(documents)
+                documents.append({"type": "event", "event": {
+                    "club": handle,
+                    "club_name": club.get('name'),
+                    "name": event.get('Name'),
+                    "date": event.get('Date'),
+                    "details": event.get('Details'),
+                }})
+                self._add(postings, doc_id, EVENT_FIELD_WEIGHTS, {
+                    "name": event.get('Name'),
+                    "club": club.get('name'),
+                    "details": event.get('Details'),
+                })
+
+        postings = {token: dict(docs) for token, docs in postings.items()}
+        # A single reference assignment: searches in flight keep the snapshot they started with
+        self._snapshot = SearchSnapshot(postings, tuple(sorted(postings)), tuple(documents))
+        logger.info(f"Search index built with {len(documents)} documents and {len(postings)} tokens.")
+
+    def search(self, query: str, limit: int = 20, doc_type: str = None) -> list[dict]:
+        """
+        :param query: free text
+        :param limit: maximum number of results
+        :param doc_type: "club" or "event" to restrict results
+        :return: matching documents, best first, each with a "score"
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return []
+
+        snapshot = self._snapshot
+        if snapshot is None:
+            return []
+        postings, vocabulary, documents = snapshot.postings, snapshot.vocabulary, snapshot.documents
+        scores = None
+        for token in tokens:
+            token_scores = self._match(token, postings, vocabulary)
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {doc_id: score + token_scores[doc_id] for doc_id, score in scores.items()
+                          if doc_id in token_scores}
+            if not scores:
+                return []
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        results = []
+        for doc_id, score in ranked:
+            document = documents[doc_id]
+            if doc_type is not None and document["type"] != doc_type:
+                continue
+            results.append({**document, "score": round(score, 3)})
+            if len(results) >= limit:
+                break
+        return results
+
+    def _match(self, token: str, postings: dict, vocabulary: list) -> dict:
+        """Best score per document for one query token, over the exact and prefix matches."""
+        matches = dict(postings.get(token, {}))
+        for i in range(bisect_left(vocabulary, token), len(vocabulary)):
+            candidate = vocabulary[i]
+            if not candidate.startswith(token):
+                break
+            if candidate == token:
+                continue
+            for doc_id, weight in postings[candidate].items():
+                score = weight * PREFIX_MATCH_FACTOR
+                if score > matches.get(doc_id, 0.0):
+                    matches[doc_id] = score
+        return matches
+
+    @staticmethod
+    def _add(postings, doc_id: int, weights: dict, fields: dict) -> None:
+        for field, text in fields.items():
+            for token in tokenize(text):
+                postings[token][doc_id] += weights[field]
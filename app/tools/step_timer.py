@@ -0,0 +1,64 @@
+import os
+import sys
+import time
+from contextlib import contextmanager
+from threading import Lock
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from tools.logger import logger
+
+
+class StepTimer:
+    """
+    Collects how long each named scraping step takes (e.g. "profile.navigate", "post.ready")
+    across every thread of a run, and summarizes it as a report.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._durations = {}
+
+    @contextmanager
+    def step(self, name: str):
+        """with timer.step("profile.parse"): ... — recorded even when the block raises"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self._durations.setdefault(name, []).append(seconds)
+
+    def snapshot(self) -> dict:
+        """:return: {step: [seconds, ...]}, e.g. to send from a worker process to the coordinator's merge"""
+        with self._lock:
+            return {name: list(values) for name, values in self._durations.items()}
+
+    def merge(self, durations: dict) -> None:
+        """Adds the durations of another timer's snapshot."""
+        with self._lock:
+            for name, values in durations.items():
+                self._durations.setdefault(name, []).extend(values)
+
+    def report(self) -> dict:
+        """:return: {step: {"count", "total_seconds", "mean_ms", "p50_ms", "p95_ms", "max_ms"}}, slowest total first"""
+        with self._lock:
+            durations = {name: sorted(values) for name, values in self._durations.items()}
+
+        report = {}
+        for name, values in sorted(durations.items(), key=lambda item: sum(item[1]), reverse=True):
+            total = sum(values)
+            report[name] = {
+                "count": len(values),
+                "total_seconds": round(total, 2),
+                "mean_ms": round(total * 1000 / len(values), 1),
+                "p50_ms": round(values[len(values) // 2] * 1000, 1),
+                "p95_ms": round(values[min(len(values) - 1, int(len(values) * 0.95))] * 1000, 1),
+                "max_ms": round(values[-1] * 1000, 1),
+            }
+        return report
+
+    def log_report(self) -> None:
+        for name, stats in self.report().items():
+            logger.info(f"Step {name}: {stats}")